@@ -1,10 +1,406 @@
+import bisect
+import functools
+import json
+import os
 import sys
-from PyQt5.QtCore import Qt, QTimer
+import threading
+import time
+from collections import OrderedDict, deque
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QSlider, QVBoxLayout, QWidget, QFileDialog, QCheckBox
 import cv2
 import numpy as np
 
+# RAM the paused player may fill with enhanced frames around the playhead
+RENDER_CACHE_MB = 256
+
+class FrameContext:
+    # Scratch buffers for one frame size, allocated once when the video is opened
+    def __init__(self, width, height):
+        self.shape = (height, width)
+        self.frame = np.empty((height, width, 3), np.uint8)
+        self.work = np.empty((height, width, 3), np.uint8)
+        self.sharpened = np.empty((height, width, 3), np.uint8)
+
+        # What the label shows: one QImage over a buffer of its own, refilled for every frame
+        self.display = np.empty((height, width, 3), np.uint8)
+        self.display_image = QImage(self.display.data, width, height, 3 * width, QImage.Format_RGB888)
+
+        # Stages that had to allocate instead of writing into their buffer
+        self.allocations = 0
+        self.frames = 0
+
+    def use(self, result, buffer):
+        if result is not buffer:
+            self.allocations += 1
+        return result
+
+    def end_frame(self):
+        self.frames += 1
+
+    def allocations_per_frame(self):
+        return self.allocations / max(self.frames, 1)
+
+class KernelPlanner:
+    # Builds a filter kernel once per parameter value and picks how to run it.
+    # make_kernel returns None when the filter would leave the frame as it is.
+    def __init__(self, make_kernel):
+        self.make_kernel = make_kernel
+        self.value = None
+        self.plan = None
+
+    def get(self, value):
+        if self.plan is None or self.value != value:
+            self.plan = (self.plan_kernel(self.make_kernel(value)),)
+            self.value = value
+        return self.plan[0]
+
+    def plan_kernel(self, kernel):
+        if kernel is None:
+            return None
+
+        kernel = np.asarray(kernel, np.float32)
+        size = kernel.shape[0]
+        center = kernel[size // 2, size // 2]
+        identity = np.zeros_like(kernel)
+        identity[size // 2, size // 2] = 1
+        if np.array_equal(kernel, identity):
+            return None
+
+        # Small kernels are cheapest as a direct filter
+        if size <= 3:
+            return ("direct", kernel)
+
+        # center + box: one box filter, whatever the kernel size
+        outer = kernel[0, 0]
+        if np.count_nonzero(kernel != outer) <= 1:
+            return ("box", (float(center - outer), float(outer * size * size), size))
+
+        # Rank one: a row pass and a column pass
+        u, s, vt = np.linalg.svd(kernel)
+        if s[1] <= 1e-6 * s[0]:
+            return ("separable", ((vt[0] * s[0]).astype(np.float32), u[:, 0].astype(np.float32)))
+
+        return ("direct", kernel)
+
+    def run(self, frame, plan, dst=None):
+        kind, data = plan
+        if kind == "box":
+            identity_weight, box_weight, size = data
+            box = cv2.boxFilter(frame, cv2.CV_32F, (size, size))
+            return cv2.addWeighted(frame, identity_weight, box, box_weight, 0, dst, cv2.CV_8U)
+        if kind == "separable":
+            return cv2.sepFilter2D(frame, -1, data[0], data[1], dst)
+        return cv2.filter2D(frame, -1, data, dst)
+
+class KeyframeIndex:
+    # Keyframe positions of one file, found by a background scan and kept in a sidecar
+    # next to the video, so each file is only scanned once
+    def __init__(self, video_path):
+        self.video_path = video_path
+        self.sidecar_path = video_path + ".keyframes.json"
+        self.frames = None
+        self.error = None
+        self.thread = threading.Thread(target=self.build, daemon=True)
+        self.thread.start()
+
+    def ready(self):
+        return self.frames is not None
+
+    def before(self, frame):
+        # The last keyframe at or before frame, or None while the index isn't there
+        if not self.frames:
+            return None
+        i = bisect.bisect_right(self.frames, frame)
+        return self.frames[i - 1] if i else None
+
+    def build(self):
+        # On its own thread. When the file can't be read or scanned the index stays empty,
+        # and seeking falls back to plain set(CAP_PROP_POS_FRAMES).
+        try:
+            self.frames = self.load_or_scan()
+        except (OSError, cv2.error) as e:
+            self.error = str(e)
+            self.frames = []
+
+    def load_or_scan(self):
+        stat = os.stat(self.video_path)
+        source = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        try:
+            with open(self.sidecar_path) as sidecar_file:
+                sidecar = json.load(sidecar_file)
+            if sidecar["source"] == source:
+                return sidecar["frames"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        keyframes = self.scan()
+        try:
+            with open(self.sidecar_path, "w") as sidecar_file:
+                json.dump({"source": source, "frames": keyframes}, sidecar_file)
+        except OSError:
+            pass
+        return keyframes
+
+    def scan(self):
+        # Raw packet mode: grab() only demuxes, and the packet flags mark the keyframes
+        capture = cv2.VideoCapture(self.video_path)
+        keyframes = []
+        try:
+            if capture.set(cv2.CAP_PROP_FORMAT, -1):
+                frame = 0
+                while capture.grab():
+                    if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                        keyframes.append(frame)
+                    frame += 1
+        finally:
+            capture.release()
+        return keyframes
+
+class PresentationClock:
+    # Frame n of the file is due at start + n / fps on the wall clock. The GUI shows each frame
+    # at its due time instead of on a fixed interval, and frames whose time has passed are
+    # skipped: by the engine without being converted or enhanced when decoding falls behind,
+    # and by the GUI when a newer frame is already waiting.
+    def __init__(self, fps, max_skips=10):
+        # Some containers report 0 for the frame rate
+        self.fps = fps if fps > 0 else 30.0
+        self.start_time = 0.0
+        self.start_frame = 0
+
+        # Late frames skipped in a row before one is shown anyway, so a decoder that can't
+        # keep up still puts a frame on screen every so often instead of grabbing forever
+        self.max_skips = max_skips
+
+        # skipped is only counted on the engine's thread, the rest on the GUI thread
+        self.shown = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def start(self, frame):
+        # frame is due now; called whenever playback starts or resumes, before the engine runs
+        self.start_time = time.perf_counter()
+        self.start_frame = frame
+
+    def due_time(self, frame):
+        return self.start_time + (frame - self.start_frame) / self.fps
+
+    def is_late(self, frame):
+        # Too late once the frame after it is due as well
+        return time.perf_counter() >= self.due_time(frame + 1)
+
+    def delay_ms(self, frame):
+        return max(0, int((self.due_time(frame) - time.perf_counter()) * 1000))
+
+    def skip(self):
+        self.skipped += 1
+
+    def drop(self):
+        self.dropped += 1
+
+    def frame_shown(self, frame):
+        jitter = abs(time.perf_counter() - self.due_time(frame)) * 1000
+        self.shown += 1
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+
+    def report(self):
+        mean = self.jitter_total / self.shown if self.shown else 0.0
+        return (f"{self.shown} frames shown at {self.fps:.2f} fps, {self.skipped} skipped before decoding, "
+                f"{self.dropped} dropped after, jitter {mean:.1f} ms mean, {self.jitter_max:.1f} ms max")
+
+class PlaybackEngine(QThread):
+    # Decodes and enhances on its own thread, at most queue_size frames ahead of the screen,
+    # and hands each finished QImage to the GUI through frame_ready. The GUI thread only
+    # shows them, so a heavy filter chain can't slow the interface down; frames the clock
+    # says are already late are grabbed and skipped so playback keeps the file's speed.
+    frame_ready = pyqtSignal(QImage, int)
+    playback_finished = pyqtSignal()
+
+    def __init__(self, video_capture, frame_context, clock, enhance, params, queue_size=3):
+        super().__init__()
+        self.video_capture = video_capture
+        self.clock = clock
+        self.frame_context = frame_context
+        self.enhance = enhance
+        self.params = params
+        self.params_lock = threading.Lock()
+        self.queue_size = queue_size
+        self.free_slots = threading.Semaphore(queue_size)
+        self.running = True
+
+    def set_params(self, params):
+        # Swapped as one tuple under the lock, so a frame never mixes old and new values
+        with self.params_lock:
+            self.params = params
+
+    def release_slot(self):
+        # The GUI is done with one frame, so the decoder may fill its slot again
+        self.free_slots.release()
+
+    def stop(self):
+        self.running = False
+        self.free_slots.release()
+        self.wait()
+
+    def run(self):
+        # One buffer and one QImage over it per slot. The semaphore keeps the decoder out of
+        # slots the GUI hasn't shown yet, and slots are used in the order the GUI frees them.
+        height, width = self.frame_context.shape
+        buffers = [np.empty((height, width, 3), np.uint8) for _ in range(self.queue_size)]
+        images = [QImage(buffer.data, width, height, 3 * width, QImage.Format_RGB888) for buffer in buffers]
+        slot = 0
+
+        while True:
+            self.free_slots.acquire()
+            if not self.running:
+                return
+
+            with self.params_lock:
+                params = self.params
+
+            index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES))
+            for _ in range(self.clock.max_skips):
+                if not self.running:
+                    return
+                if not self.clock.is_late(index):
+                    break
+                if not self.video_capture.grab():
+                    self.playback_finished.emit()
+                    return
+                self.clock.skip()
+                index += 1
+
+            ret, frame = self.video_capture.read(self.frame_context.frame)
+            if not ret:
+                self.playback_finished.emit()
+                return
+
+            np.copyto(buffers[slot], self.enhance(frame, params))
+            self.frame_ready.emit(images[slot], index + 1)
+            slot = (slot + 1) % self.queue_size
+
+class RenderCache:
+    # Enhanced frames keyed by (frame index, enhancement params), least recently used first.
+    # The params are part of the key, so a frame rendered just before a slider moved is never
+    # shown for the new settings.
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.frames = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, index, params):
+        with self.lock:
+            frame = self.frames.get((index, params))
+            if frame is not None:
+                self.frames.move_to_end((index, params))
+            return frame
+
+    def touch(self, index, params):
+        # Whether the frame is cached; marks it as recently used like get does
+        return self.get(index, params) is not None
+
+    def put(self, index, params, frame):
+        with self.lock:
+            if (index, params) in self.frames or frame.nbytes > self.budget_bytes:
+                return
+            self.frames[(index, params)] = frame
+            self.size += frame.nbytes
+            while self.size > self.budget_bytes:
+                _, old = self.frames.popitem(last=False)
+                self.size -= old.nbytes
+
+    def retain(self, params):
+        # After a slider moved only frames rendered with the new settings are worth keeping
+        with self.lock:
+            for key in [key for key in self.frames if key[1] != params]:
+                self.size -= self.frames.pop(key).nbytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.size = 0
+
+class RenderAhead:
+    # Fills the cache with the frames around the playhead while the player is paused, on a
+    # thread with its own capture and scratch buffers. The window is as many frames as the
+    # cache holds, three quarters of it ahead of the playhead. Frames ahead are rendered
+    # first, then the ones behind, each run decoding forward from a single seek; follow()
+    # moves the window and the old run is abandoned at its next frame.
+    def __init__(self, video_path, frame_context, cache, enhance):
+        self.video_capture = cv2.VideoCapture(video_path)
+        self.frame_count = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_context = frame_context
+        self.cache = cache
+        self.enhance = enhance
+
+        height, width = frame_context.shape
+        window = max(cache.budget_bytes // (height * width * 3), 1)
+        self.ahead = window - window // 4
+        self.behind = window // 4
+
+        self.job = None
+        self.generation = 0
+        self.running = True
+        self.wake = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def follow(self, center, params):
+        with self.wake:
+            self.job = (center, params)
+            self.generation += 1
+            self.wake.notify()
+
+    def idle(self):
+        # Playback needs the CPU more than the cache does
+        with self.wake:
+            self.job = None
+            self.generation += 1
+
+    def stop(self):
+        with self.wake:
+            self.running = False
+            self.generation += 1
+            self.wake.notify()
+        self.thread.join()
+        self.video_capture.release()
+
+    def run(self):
+        while True:
+            with self.wake:
+                while self.running and self.job is None:
+                    self.wake.wait()
+                if not self.running:
+                    return
+                (center, params), generation = self.job, self.generation
+                self.job = None
+
+            self.render(center, min(center + self.ahead, self.frame_count), params, generation)
+            self.render(max(center - self.behind, 0), center, params, generation)
+
+    def render(self, first, end, params, generation):
+        # Frames first to end - 1; the ones already cached are only grabbed on the way
+        missing = [index for index in range(first, end) if not self.cache.touch(index, params)]
+        if not missing:
+            return
+
+        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, missing[0])
+        for index in range(missing[0], end):
+            if self.generation != generation:
+                return
+            if self.cache.touch(index, params):
+                self.video_capture.grab()
+                continue
+            ret, frame = self.video_capture.read(self.frame_context.frame)
+            if not ret:
+                return
+            self.cache.put(index, params, self.enhance(frame, params, self.frame_context).copy())
+
 class VideoEnhancerGUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -18,6 +414,7 @@ class VideoEnhancerGUI(QMainWindow):
         self.video_player = QLabel(self)
         self.video_player.setAlignment(Qt.AlignCenter)
         self.video_timer = QTimer(self)
+        self.video_timer.setSingleShot(True)
         self.video_timer.timeout.connect(self.update_frame)
 
         # Create sliders for enhancement parameters
@@ -63,8 +460,17 @@ class VideoEnhancerGUI(QMainWindow):
         self.video_slider = QSlider(Qt.Horizontal)
         self.video_slider.sliderPressed.connect(self.pause_video)
         self.video_slider.sliderReleased.connect(self.seek_video)
+        self.video_slider.sliderMoved.connect(self.scrub_video)
         self.video_slider.setEnabled(False)
 
+        # Seek timings drawn over the video
+        self.seek_overlay_checkbox = QCheckBox('Show seek latency')
+        self.seek_overlay_checkbox.stateChanged.connect(self.toggle_seek_overlay)
+        self.seek_overlay = QLabel(self.video_player)
+        self.seek_overlay.setStyleSheet('background-color: rgba(0, 0, 0, 160); color: white; padding: 2px;')
+        self.seek_overlay.move(4, 4)
+        self.seek_overlay.hide()
+
         # Set up the layout
         layout = QVBoxLayout()
         layout.addWidget(self.video_player)
@@ -81,6 +487,7 @@ class VideoEnhancerGUI(QMainWindow):
         layout.addWidget(self.contrast_label)
         layout.addWidget(self.sharpening_label)
         layout.addWidget(self.video_slider)
+        layout.addWidget(self.seek_overlay_checkbox)
 
         widget = QWidget()
         widget.setLayout(layout)
@@ -90,99 +497,315 @@ class VideoEnhancerGUI(QMainWindow):
         self.video_capture = None
         self.frame_count = 0
         self.frame_position = 0
+        self.frame_context = None
+        self.keyframe_index = None
+        self.clock = None
+
+        # Playback runs on the engine's thread; frames it finished wait here until they are due
+        self.playback_engine = None
+        self.ready_frames = deque()
+        self.playback_ended = False
+
+        # Enhanced frames around the playhead, rendered in the background while paused
+        self.render_cache = RenderCache(RENDER_CACHE_MB * 1024 * 1024)
+        self.render_ahead = None
+
+        # Sharpening kernel, rebuilt only when the slider moves. The planner caches the last
+        # kernel, so the playback engine and the background renderer get planners of their own.
+        self.sharpen_planner = self.make_sharpen_planner()
+
+    def make_sharpen_planner(self):
+        return KernelPlanner(
+            lambda value: np.array([[0, -1, 0], [-1, 5 + value, -1], [0, -1, 0]], dtype=np.float32) if value > 0 else None
+        )
 
     def open_video_file(self):
         file_dialog = QFileDialog()
         video_path, _ = file_dialog.getOpenFileName(self, 'Open Video File', '', 'Video Files (*.mp4 *.avi)')
         if video_path:
+            # The engine must be done with the old file before the capture is replaced
+            self.pause_video()
+            self.stop_render_ahead()
             self.video_capture = cv2.VideoCapture(video_path)
             self.frame_count = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            width = int(self.video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.frame_context = FrameContext(width, height)
+            self.keyframe_index = KeyframeIndex(video_path)
+            self.clock = PresentationClock(self.video_capture.get(cv2.CAP_PROP_FPS))
+            enhance = functools.partial(self.apply_enhancements, planner=self.make_sharpen_planner())
+            self.render_ahead = RenderAhead(video_path, FrameContext(width, height), self.render_cache, enhance)
+            self.frame_position = 0
             self.video_slider.setMinimum(0)
             self.video_slider.setMaximum(self.frame_count - 1)
             self.video_slider.setEnabled(True)
             self.play_video()
 
     def play_video(self):
-        if not self.video_timer.isActive():
-            self.video_timer.start(33)  # Update frame every 33 milliseconds (approx. 30 FPS)
+        if self.video_capture is None or not self.video_capture.isOpened():
+            return
+
+        if self.playback_engine is None:
+            self.start_engine()
             self.play_button.setText('Pause')
         else:
-            self.video_timer.stop()
+            self.pause_video()
             self.play_button.setText('Play')
 
     def pause_video(self):
         self.video_timer.stop()
+        self.stop_engine()
+        self.follow_playhead()
 
     def stop_video(self):
         self.video_timer.stop()
+        self.stop_engine()
+        self.stop_render_ahead()
         self.video_capture.release()
+        # Playback stats for the run that just ended
+        self.statusBar().showMessage(f'{self.clock.report()}, {self.frame_context.allocations_per_frame():.2f} allocations per frame')
         self.video_player.clear()
         self.play_button.setText('Play')
 
-    def update_frame(self):
-        ret, frame = self.video_capture.read()
-        if ret:
-            self.frame_position = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES))
-            self.video_slider.setValue(self.frame_position)
+    def start_engine(self):
+        # The engine decodes ahead, so after a pause the decoder may be past the frame on screen
+        if int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) != self.frame_position:
+            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, self.frame_position)
+
+        # The frame on screen now is followed by the next one right away
+        self.clock.start(self.frame_position)
+        if self.render_ahead is not None:
+            self.render_ahead.idle()
+        enhance = functools.partial(self.apply_enhancements, planner=self.make_sharpen_planner())
+        engine = PlaybackEngine(self.video_capture, self.frame_context, self.clock, enhance, self.enhancement_params())
+        # Signals still queued from an engine that was stopped are ignored
+        engine.frame_ready.connect(lambda image, position: self.queue_frame(engine, image, position))
+        engine.playback_finished.connect(lambda: self.end_playback(engine))
+        self.playback_engine = engine
+        self.playback_ended = False
+        engine.start()
+
+    def stop_engine(self):
+        # Frames decoded ahead but not shown yet are dropped
+        if self.playback_engine is not None:
+            self.playback_engine.stop()
+            self.playback_engine = None
+        self.ready_frames.clear()
+
+    def follow_playhead(self):
+        # While paused, the renderer fills the cache around the frame on screen
+        if self.render_ahead is not None and self.playback_engine is None:
+            self.render_ahead.follow(max(self.frame_position - 1, 0), self.enhancement_params())
+
+    def stop_render_ahead(self):
+        if self.render_ahead is not None:
+            self.render_ahead.stop()
+            self.render_ahead = None
+        self.render_cache.clear()
+
+    def queue_frame(self, engine, image, position):
+        # The timer only runs while a frame waits for its time, so an idle GUI looks at this one now
+        if engine is self.playback_engine:
+            self.ready_frames.append((image, position))
+            if not self.video_timer.isActive():
+                self.update_frame()
+
+    def end_playback(self, engine):
+        if engine is self.playback_engine:
+            self.playback_ended = True
+            if not self.video_timer.isActive():
+                self.update_frame()
 
-            # Apply enhancements to the frame using OpenCV functions
-            enhanced_frame = self.apply_enhancements(frame)
-
-            # Convert the frame to QImage for displaying in QLabel
-            height, width, channel = enhanced_frame.shape
-            bytes_per_line = channel * width
-            q_image = QImage(enhanced_frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-
-            # Display the frame in the QLabel
-            self.video_player.setPixmap(QPixmap.fromImage(q_image))
-
-            if self.frame_position == self.frame_count - 1:
+    def update_frame(self):
+        # Show the oldest frame the engine has ready once it is due; the decoding and enhancing
+        # happen on its thread. Positions count frames read, so a frame's index is one less.
+        # A frame whose time has passed is dropped when a newer one is already waiting.
+        while len(self.ready_frames) > 1 and self.clock.is_late(self.ready_frames[0][1] - 1):
+            self.ready_frames.popleft()
+            self.playback_engine.release_slot()
+            self.clock.drop()
+
+        if not self.ready_frames:
+            if self.playback_ended:
                 self.stop_video()
-
-    def apply_enhancements(self, frame):
-        # Apply enhancements (brightness, contrast, sharpening, etc.) to the frame using OpenCV functions
-        enhanced_frame = frame.copy()
+            return
+
+        image, position = self.ready_frames[0]
+        delay = self.clock.delay_ms(position - 1)
+        if delay > 0:
+            self.video_timer.start(delay)
+            return
+
+        self.ready_frames.popleft()
+        self.video_player.setPixmap(QPixmap.fromImage(image))
+        self.clock.frame_shown(position - 1)
+        self.playback_engine.release_slot()
+
+        self.frame_position = position
+        self.video_slider.setValue(self.frame_position)
+        if self.frame_position == self.frame_count - 1:
+            self.stop_video()
+        elif self.ready_frames:
+            self.video_timer.start(self.clock.delay_ms(self.ready_frames[0][1] - 1))
+        elif self.playback_ended:
+            self.stop_video()
+
+    def show_frame(self, frame):
+        # Apply enhancements to the frame using OpenCV functions
+        enhanced_frame = self.apply_enhancements(frame)
+
+        # Copy it into the context's display buffer, which the persistent QImage reads from
+        np.copyto(self.frame_context.display, enhanced_frame)
+
+        # Display the frame in the QLabel
+        self.video_player.setPixmap(QPixmap.fromImage(self.frame_context.display_image))
+
+    def enhancement_params(self):
+        # Value of each enhancement, or None when its checkbox is off. Read on the GUI thread
+        # and handed to the playback engine as one tuple.
+        return (
+            self.brightness if self.brightness_checkbox.isChecked() else None,
+            self.contrast if self.contrast_checkbox.isChecked() else None,
+            self.sharpening if self.sharpening_checkbox.isChecked() else None,
+        )
+
+    def update_engine_params(self):
+        params = self.enhancement_params()
+        if self.playback_engine is not None:
+            self.playback_engine.set_params(params)
+        self.render_cache.retain(params)
+        self.follow_playhead()
+
+    def apply_enhancements(self, frame, params=None, context=None, planner=None):
+        # Apply enhancements (brightness, contrast, sharpening, etc.) to the frame using OpenCV functions.
+        # Every stage writes into the context's work buffer, so no frame is allocated here.
+        # The playback engine passes params in, since it doesn't run on the GUI thread, and
+        # the background renderer passes its own context as well. Both pass their own planner.
+        brightness, contrast, sharpening = params or self.enhancement_params()
+        planner = planner or self.sharpen_planner
+        if context is None:
+            context = self.frame_context
+            if context is None or context.shape != frame.shape[:2]:
+                context = self.frame_context = FrameContext(frame.shape[1], frame.shape[0])
+        enhanced_frame = frame
 
         # Apply brightness adjustment if checkbox is checked
-        if self.brightness_checkbox.isChecked():
-            enhanced_frame = cv2.add(enhanced_frame, self.brightness)
+        if brightness is not None:
+            enhanced_frame = context.use(cv2.add(enhanced_frame, brightness, context.work), context.work)
 
         # Apply contrast adjustment if checkbox is checked
-        if self.contrast_checkbox.isChecked():
-            enhanced_frame = cv2.multiply(enhanced_frame, self.contrast)
+        if contrast is not None:
+            enhanced_frame = context.use(cv2.multiply(enhanced_frame, contrast, context.work), context.work)
 
         # Apply sharpening if checkbox is checked
-        if self.sharpening_checkbox.isChecked() and self.sharpening > 0:
-            kernel = np.array([[0, -1, 0], [-1, 5 + self.sharpening, -1], [0, -1, 0]], dtype=np.float32)
-            enhanced_frame = cv2.filter2D(enhanced_frame, -1, kernel)
+        plan = planner.get(sharpening) if sharpening is not None else None
+        if plan is not None:
+            enhanced_frame = context.use(planner.run(enhanced_frame, plan, context.sharpened), context.sharpened)
 
+        context.end_frame()
         return enhanced_frame
 
     def update_brightness(self, value):
         self.brightness = value
         self.brightness_label.setText(f'Brightness: {self.brightness}')
+        self.update_engine_params()
 
     def update_contrast(self, value):
         self.contrast = value / 100.0
         self.contrast_label.setText(f'Contrast: {self.contrast}')
+        self.update_engine_params()
 
     def update_sharpening(self, value):
         self.sharpening = value
         self.sharpening_label.setText(f'Sharpening: {self.sharpening}')
+        self.update_engine_params()
 
     def toggle_brightness(self, state):
         self.brightness_slider.setEnabled(state)
+        self.update_engine_params()
 
     def toggle_contrast(self, state):
         self.contrast_slider.setEnabled(state)
+        self.update_engine_params()
 
     def toggle_sharpening(self, state):
         self.sharpening_slider.setEnabled(state)
+        self.update_engine_params()
+
+    def toggle_seek_overlay(self, state):
+        self.seek_overlay.setVisible(bool(state))
+
+    def keyPressEvent(self, event):
+        # Left and right step one frame while paused
+        step = {Qt.Key_Left: -1, Qt.Key_Right: 1}.get(event.key())
+        if step is None or self.playback_engine is not None or self.video_capture is None or not self.video_capture.isOpened():
+            super().keyPressEvent(event)
+            return
+
+        target = min(max(self.frame_position - 1 + step, 0), self.frame_count - 1)
+        self.show_position(target)
+        self.video_slider.setValue(target)
+        self.follow_playhead()
 
     def seek_video(self):
-        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, self.video_slider.value())
-        self.frame_position = self.video_slider.value()
-        self.video_timer.start(33)
+        self.show_position(self.video_slider.value())
+        self.start_engine()
+
+    def scrub_video(self, value):
+        self.show_position(value)
+        self.follow_playhead()
+
+    def show_position(self, target):
+        # A frame the renderer already has for the current settings is shown as it is;
+        # anything else is decoded here
+        start = time.perf_counter()
+        cached = self.render_cache.get(target, self.enhancement_params())
+        if cached is None:
+            ret, frame = self.seek_to(target)
+            if ret:
+                self.show_frame(frame)
+            return
+
+        np.copyto(self.frame_context.display, cached)
+        self.video_player.setPixmap(QPixmap.fromImage(self.frame_context.display_image))
+        self.frame_position = target + 1
+
+        latency = (time.perf_counter() - start) * 1000
+        self.seek_overlay.setText(f'Seek to {target}: {latency:.1f} ms, from the render cache')
+        self.seek_overlay.adjustSize()
+
+    def seek_to(self, target):
+        # Read frame target. Without a keyframe between the decoder and the target it just
+        # decodes forward; otherwise it jumps to the keyframe before the target and decodes
+        # from there. grab() skips the colour conversion of the frames in between. Frames shown
+        # from the render cache don't move the decoder, so its own position is asked for.
+        start = time.perf_counter()
+        keyframe = self.keyframe_index.before(target) if self.keyframe_index else None
+        position = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES))
+        if keyframe is None:
+            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+            skipped = 0
+        elif keyframe <= position <= target:
+            skipped = target - position
+        else:
+            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            skipped = target - keyframe
+
+        for _ in range(skipped):
+            self.video_capture.grab()
+        ret, frame = self.video_capture.read(self.frame_context.frame)
+        self.frame_position = target + 1
+
+        latency = (time.perf_counter() - start) * 1000
+        if self.keyframe_index is not None and self.keyframe_index.error is not None:
+            source = 'keyframe scan failed'
+        elif self.keyframe_index is not None and self.keyframe_index.ready():
+            source = f'from keyframe {keyframe}' if keyframe is not None else 'no keyframes found'
+        else:
+            source = 'indexing keyframes'
+        self.seek_overlay.setText(f'Seek to {target}: {latency:.1f} ms, {skipped + 1} frames decoded ({source})')
+        self.seek_overlay.adjustSize()
+        return ret, frame
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -1,4 +1,5 @@
 import sys
+import time
 import cv2
 from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QFileDialog, QCheckBox, QSlider
 from PyQt5.QtGui import QPixmap, QImage
@@ -6,6 +7,106 @@ from PyQt5.QtCore import QTimer, Qt
 import numpy as np
 
 
+class PresentationClock:
+    # Frame n of the file is due at start + n / fps on the wall clock. The player arms its timer
+    # for the next frame's due time instead of a fixed interval, and frames whose time has
+    # already passed are skipped without being converted or enhanced.
+    def __init__(self, fps, max_skips=10):
+        # Some containers report 0 for the frame rate
+        self.fps = fps if fps > 0 else 30.0
+        self.start_time = 0.0
+        self.start_frame = 0
+
+        # Late frames skipped in a row before one is shown anyway, so a decoder that can't
+        # keep up still puts a frame on screen every so often instead of grabbing forever
+        self.max_skips = max_skips
+
+        self.shown = 0
+        self.dropped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def start(self, frame):
+        # frame is due now; called whenever playback starts or resumes
+        self.start_time = time.perf_counter()
+        self.start_frame = frame
+
+    def due_time(self, frame):
+        return self.start_time + (frame - self.start_frame) / self.fps
+
+    def is_late(self, frame):
+        # Too late once the frame after it is due as well
+        return time.perf_counter() >= self.due_time(frame + 1)
+
+    def delay_ms(self, frame):
+        return max(0, int((self.due_time(frame) - time.perf_counter()) * 1000))
+
+    def drop(self):
+        self.dropped += 1
+
+    def frame_shown(self, frame):
+        jitter = abs(time.perf_counter() - self.due_time(frame)) * 1000
+        self.shown += 1
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+
+    def report(self):
+        mean = self.jitter_total / self.shown if self.shown else 0.0
+        return (f"{self.shown} frames shown, {self.dropped} dropped at {self.fps:.2f} fps, "
+                f"jitter {mean:.1f} ms mean, {self.jitter_max:.1f} ms max")
+
+class KernelPlanner:
+    # Builds a filter kernel once per parameter value and picks how to run it.
+    # make_kernel returns None when the filter would leave the frame as it is.
+    def __init__(self, make_kernel):
+        self.make_kernel = make_kernel
+        self.value = None
+        self.plan = None
+
+    def get(self, value):
+        if self.plan is None or self.value != value:
+            self.plan = (self.plan_kernel(self.make_kernel(value)),)
+            self.value = value
+        return self.plan[0]
+
+    def plan_kernel(self, kernel):
+        if kernel is None:
+            return None
+
+        kernel = np.asarray(kernel, np.float32)
+        size = kernel.shape[0]
+        center = kernel[size // 2, size // 2]
+        identity = np.zeros_like(kernel)
+        identity[size // 2, size // 2] = 1
+        if np.array_equal(kernel, identity):
+            return None
+
+        # Small kernels are cheapest as a direct filter
+        if size <= 3:
+            return ("direct", kernel)
+
+        # center + box: one box filter, whatever the kernel size
+        outer = kernel[0, 0]
+        if np.count_nonzero(kernel != outer) <= 1:
+            return ("box", (float(center - outer), float(outer * size * size), size))
+
+        # Rank one: a row pass and a column pass
+        u, s, vt = np.linalg.svd(kernel)
+        if s[1] <= 1e-6 * s[0]:
+            return ("separable", ((vt[0] * s[0]).astype(np.float32), u[:, 0].astype(np.float32)))
+
+        return ("direct", kernel)
+
+    def run(self, frame, plan, dst=None):
+        kind, data = plan
+        if kind == "box":
+            identity_weight, box_weight, size = data
+            box = cv2.boxFilter(frame, cv2.CV_32F, (size, size))
+            return cv2.addWeighted(frame, identity_weight, box, box_weight, 0, dst, cv2.CV_8U)
+        if kind == "separable":
+            return cv2.sepFilter2D(frame, -1, data[0], data[1], dst)
+        return cv2.filter2D(frame, -1, data, dst)
+
 class VideoEnhancerGUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -40,6 +141,9 @@ class VideoEnhancerGUI(QMainWindow):
         self.hue_label = QLabel('Hue: 0')
 
         self.video_timer = QTimer()
+        self.video_timer.setSingleShot(True)
+        self.clock = None
+        self.next_frame = 0
         self.brightness = 0
         self.contrast = 1.0
         self.sharpening = 0
@@ -47,6 +151,18 @@ class VideoEnhancerGUI(QMainWindow):
         self.saturation = 1.0
         self.hue = 0
 
+        # Forward and inverse conversions for stages that don't work on BGR
+        self.color_conversions = {"hsv": (cv2.COLOR_BGR2HSV, cv2.COLOR_HSV2BGR)}
+
+        # Buffer and QImage the player shows, made once per frame size
+        self.display_buffer = None
+        self.display_image = None
+
+        # Sharpening kernel, rebuilt only when the slider moves
+        self.sharpen_planner = KernelPlanner(
+            lambda value: np.array([[0, -1, 0], [-1, 5 + value, -1], [0, -1, 0]], dtype=np.float32) if value != 0 else None
+        )
+
         self.initialize_ui()
 
     def initialize_ui(self):
@@ -114,60 +230,123 @@ class VideoEnhancerGUI(QMainWindow):
         if video_path:
             self.video_capture = cv2.VideoCapture(video_path)
             self.frame_count = int(self.video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.clock = PresentationClock(self.video_capture.get(cv2.CAP_PROP_FPS))
+            self.next_frame = 0
             self.play_video()
 
     def play_video(self):
-        self.video_timer.start(33)
+        if self.clock is None:
+            return
+
+        # The next frame is due right away, the ones after it at the file's frame rate
+        self.clock.start(self.next_frame)
+        self.video_timer.start(0)
 
     def stop_video(self):
         self.video_timer.stop()
+        # Playback stats for the run that just ended
+        if self.clock is not None:
+            self.statusBar().showMessage(self.clock.report())
 
     def update_frame(self):
+        # Frames whose time has passed are only grabbed, so playback keeps the file's speed
+        # when the enhancements fall behind
+        for _ in range(self.clock.max_skips):
+            if not self.clock.is_late(self.next_frame):
+                break
+            if not self.video_capture.grab():
+                return
+            self.clock.drop()
+            self.next_frame += 1
+
         ret, frame = self.video_capture.read()
         if ret:
             enhanced_frame = self.apply_enhancements(frame)
             image = self.convert_image(enhanced_frame)
             self.video_player.setPixmap(QPixmap.fromImage(image))
+            self.clock.frame_shown(self.next_frame)
+
+            # Wait for the next frame's time
+            self.next_frame += 1
+            self.video_timer.start(self.clock.delay_ms(self.next_frame))
 
     def apply_enhancements(self, frame):
+        # Build the list of enabled stages with the color space each one works in
+        stages = []
+
         # Apply brightness adjustment if checkbox is checked
         if self.brightness_checkbox.isChecked():
-            hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            hsv_frame[:, :, 2] = cv2.add(hsv_frame[:, :, 2], self.brightness)
-            frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
+            stages.append(("hsv", self.adjust_brightness))
 
         # Apply contrast adjustment if checkbox is checked
         if self.contrast_checkbox.isChecked():
-            frame = cv2.multiply(frame, self.contrast)
+            stages.append(("bgr", lambda f: cv2.multiply(f, self.contrast)))
 
         # Apply sharpening adjustment if checkbox is checked
-        if self.sharpening_checkbox.isChecked() and self.sharpening != 0:
-            kernel = np.array([[0, -1, 0], [-1, 5 + self.sharpening, -1], [0, -1, 0]], dtype=np.float32)
-            frame = cv2.filter2D(frame, -1, kernel)
+        if self.sharpening_checkbox.isChecked() and self.sharpen_planner.get(self.sharpening) is not None:
+            stages.append(("bgr", self.sharpen))
 
         # Apply color adjustment if checkbox is checked
         if self.color_checkbox.isChecked():
-            frame = cv2.add(frame, self.color)
+            stages.append(("bgr", lambda f: cv2.add(f, self.color)))
 
         # Apply saturation adjustment if checkbox is checked
         if self.saturation_checkbox.isChecked() and self.saturation != 1.0:
-            hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            hsv_frame[:, :, 1] = cv2.multiply(hsv_frame[:, :, 1], self.saturation)
-            frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
+            stages.append(("hsv", self.adjust_saturation))
 
         # Apply hue adjustment if checkbox is checked
         if self.hue_checkbox.isChecked() and self.hue != 0:
-            hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            hsv_frame[:, :, 0] = (hsv_frame[:, :, 0] + self.hue) % 180
-            frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
-
+            stages.append(("hsv", self.adjust_hue))
+
+        return self.run_stages(self.optimize_stages(stages), frame)
+
+    def optimize_stages(self, stages):
+        # Merge adjacent stages that work in the same color space, so each group
+        # converts into that space once and back once
+        groups = []
+        for space, function in stages:
+            if groups and groups[-1][0] == space:
+                groups[-1][1].append(function)
+            else:
+                groups.append((space, [function]))
+        return groups
+
+    def run_stages(self, groups, frame):
+        for space, functions in groups:
+            if space in self.color_conversions:
+                frame = cv2.cvtColor(frame, self.color_conversions[space][0])
+
+            for function in functions:
+                frame = function(frame)
+
+            if space in self.color_conversions:
+                frame = cv2.cvtColor(frame, self.color_conversions[space][1])
         return frame
 
+    def adjust_brightness(self, hsv_frame):
+        hsv_frame[:, :, 2] = cv2.add(hsv_frame[:, :, 2], self.brightness)
+        return hsv_frame
+
+    def sharpen(self, frame):
+        return self.sharpen_planner.run(frame, self.sharpen_planner.get(self.sharpening))
+
+    def adjust_saturation(self, hsv_frame):
+        hsv_frame[:, :, 1] = cv2.multiply(hsv_frame[:, :, 1], self.saturation)
+        return hsv_frame
+
+    def adjust_hue(self, hsv_frame):
+        hsv_frame[:, :, 0] = (hsv_frame[:, :, 0] + self.hue) % 180
+        return hsv_frame
+
     def convert_image(self, frame):
-        height, width, channel = frame.shape
-        bytes_per_line = channel * width
-        image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_BGR888)
-        return image
+        # Refill the persistent buffer instead of wrapping a new QImage around every frame
+        if self.display_buffer is None or self.display_buffer.shape != frame.shape:
+            height, width, channel = frame.shape
+            bytes_per_line = channel * width
+            self.display_buffer = np.empty((height, width, channel), np.uint8)
+            self.display_image = QImage(self.display_buffer.data, width, height, bytes_per_line, QImage.Format_BGR888)
+        np.copyto(self.display_buffer, frame)
+        return self.display_image
 
     def update_brightness(self, value):
         self.brightness = value
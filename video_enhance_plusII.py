@@ -3,6 +3,45 @@ from tkinter import filedialog
 import cv2
 import numpy as np
 
+def plan_stages(stages):
+    # Collapse each run of per-channel stages into one 256-entry lookup table per channel.
+    # Each stage is (name, per_channel, function); stages that mix channels are kept as they are.
+    plan = []
+    run = []
+
+    for name, per_channel, function in stages:
+        if per_channel:
+            run.append(function)
+            continue
+
+        if run:
+            plan.append(build_channel_lut(run))
+            run = []
+        plan.append(function)
+
+    if run:
+        plan.append(build_channel_lut(run))
+
+    return plan
+
+def build_channel_lut(functions):
+    # Push every possible 8-bit value of each channel through the stages once
+    table = np.repeat(np.arange(256, dtype=np.uint8).reshape(1, 256, 1), 3, axis=2)
+    for function in functions:
+        table = function(table)
+
+    return lambda frame: cv2.LUT(frame, table)
+
+def run_plan(plan, frame):
+    for function in plan:
+        frame = function(frame)
+    return frame
+
+def adjust_saturation(frame, value):
+    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * value
+    return cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
+
 def enhance_video():
     # Function to enhance the selected video
     
@@ -34,16 +73,19 @@ def enhance_video():
         contrast_value = contrast_slider.get()
         saturation_value = saturation_slider.get()
         
+        # Enhancement stages; saturation mixes channels so it stays on the full path
+        plan = plan_stages([
+            ("brightness/contrast", True, lambda f: cv2.convertScaleAbs(f, alpha=contrast_value, beta=brightness_value)),
+            ("saturation", False, lambda f: adjust_saturation(f, saturation_value)),
+        ])
+        
         # Process each frame of the video
         for _ in range(frame_count):
             ret, frame = video.read()
             
             if ret:
                 # Apply video enhancement effects to the frame
-                enhanced_frame = cv2.convertScaleAbs(frame, alpha=contrast_value, beta=brightness_value)
-                hsv_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2HSV)
-                hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
-                enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
+                enhanced_frame = run_plan(plan, frame)
                 
                 # Write the enhanced frame to the output video file
                 writer.write(enhanced_frame)
@@ -1,9 +1,138 @@
+import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 import cv2
 import numpy as np
 from PIL import Image, ImageTk
 
+class FramePipeline:
+    # Decode -> enhance -> encode on separate threads joined by bounded queues.
+    # The writer puts results back in the order the reader produced them.
+    def __init__(self, read, process, write, workers=1, queue_size=8):
+        self.read = read
+        self.process = process
+        self.write = write
+        self.workers = workers
+        self.decoded = queue.Queue(queue_size)
+        self.enhanced = queue.Queue(queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.error = None
+        self.written = 0
+
+        # Seconds each stage spent working and waiting on its queues
+        self.stats = {stage: {"busy": 0.0, "stalled": 0.0} for stage in ("read", "enhance", "write")}
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.read_loop, daemon=True)]
+        self.threads += [threading.Thread(target=self.enhance_loop, daemon=True) for _ in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.write_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def run(self):
+        self.start()
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def record(self, stage, kind, start):
+        with self.lock:
+            self.stats[stage][kind] += time.perf_counter() - start
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+
+    def read_loop(self):
+        index = 0
+        try:
+            while self.error is None:
+                start = time.perf_counter()
+                item = self.read()
+                self.record("read", "busy", start)
+                if item is None:
+                    break
+
+                # Blocking here means the enhancement workers can't keep up
+                start = time.perf_counter()
+                self.decoded.put((index, item))
+                self.record("read", "stalled", start)
+                index += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.workers):
+                self.decoded.put(None)
+
+    def enhance_loop(self):
+        while True:
+            start = time.perf_counter()
+            job = self.decoded.get()
+            self.record("enhance", "stalled", start)
+            if job is None:
+                break
+
+            index, item = job
+            start = time.perf_counter()
+            try:
+                result = self.process(item)
+            except Exception as e:
+                self.fail(e)
+                continue
+            self.record("enhance", "busy", start)
+
+            start = time.perf_counter()
+            self.enhanced.put((index, result))
+            self.record("enhance", "stalled", start)
+
+        self.enhanced.put(None)
+
+    def write_loop(self):
+        pending = {}
+        next_index = 0
+        finished = 0
+        while finished < self.workers:
+            start = time.perf_counter()
+            job = self.enhanced.get()
+            self.record("write", "stalled", start)
+            if job is None:
+                finished += 1
+                continue
+
+            index, result = job
+            pending[index] = result
+            while next_index in pending:
+                result = pending.pop(next_index)
+                next_index += 1
+                if self.error is not None:
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    self.write(result)
+                except Exception as e:
+                    self.fail(e)
+                self.record("write", "busy", start)
+                self.written += 1
+
+    def summary(self):
+        # The stage that stalls the least (per thread) is the one holding the others back
+        threads = {"read": 1, "enhance": self.workers, "write": 1}
+        stalled = {stage: times["stalled"] / threads[stage] for stage, times in self.stats.items()}
+        lines = [f"{stage}: busy {times['busy']:.2f}s, stalled {times['stalled']:.2f}s" for stage, times in self.stats.items()]
+        limiting = min(stalled, key=stalled.get)
+        lines.append(f"limited by: {limiting}")
+        return "\n".join(lines)
+
 def enhance_video():
     # Function to enhance the selected video
     
@@ -36,43 +165,76 @@ def enhance_video():
         saturation_value = saturation_slider.get()
         sharpen_value = sharpen_slider.get()
         
-        # Process each frame of the video
-        for frame_index in range(frame_count):
-            ret, frame = video.read()
+        # Decode, enhance and encode on their own threads
+        def read_frames():
+            for _ in range(frame_count):
+                ret, frame = video.read()
+                if ret:
+                    yield frame
+        
+        def enhance_frame(frame):
+            # Apply video enhancement effects to the frame
+            enhanced_frame = cv2.convertScaleAbs(frame, alpha=contrast_value, beta=brightness_value)
+            hsv_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2HSV)
+            hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
+            enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
             
-            if ret:
-                # Apply video enhancement effects to the frame
-                enhanced_frame = cv2.convertScaleAbs(frame, alpha=contrast_value, beta=brightness_value)
-                hsv_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2HSV)
-                hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
-                enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
-                
-                # Apply sharpening to the frame
-                sharpened_frame = cv2.filter2D(enhanced_frame, -1, sharpening_kernel * sharpen_value)
-                enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
-                
-                # Write the enhanced frame to the output video file
-                writer.write(enhanced_frame)
-                
+            # Apply sharpening to the frame; at zero it would leave the frame as it is
+            if sharpen_value == 0:
+                return enhanced_frame
+            sharpened_frame = cv2.filter2D(enhanced_frame, -1, sharpening_kernel * sharpen_value)
+            return cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
+        
+        preview = {}
+        
+        def write_frame(enhanced_frame):
+            # Write the enhanced frame to the output video file
+            writer.write(enhanced_frame)
+            
+            # Hand every preview_interval-th frame to the GUI thread
+            if pipeline.written % preview_interval == 0:
+                preview["frame"] = enhanced_frame
+        
+        frames = read_frames()
+        pipeline = FramePipeline(lambda: next(frames, None), enhance_frame, write_frame, workers=enhance_workers)
+        pipeline.start()
+        
+        # Tk may only be touched from this thread, so poll the pipeline from the main loop
+        def poll_pipeline():
+            if pipeline.is_alive():
                 # Update progress label
-                progress_label.config(text=f"Processing frame {frame_index}/{frame_count - 1}")
+                progress_label.config(text=f"Processing frame {pipeline.written}/{frame_count - 1}")
                 
                 # Display the enhanced frame in the preview window
-                if frame_index % preview_interval == 0:
+                enhanced_frame = preview.pop("frame", None)
+                if enhanced_frame is not None:
                     preview_image = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2RGB)
                     preview_image = Image.fromarray(preview_image)
                     preview_image = ImageTk.PhotoImage(preview_image)
                     preview_label.config(image=preview_image)
                     preview_label.image = preview_image  # Keep a reference to prevent image garbage collection
-                    window.update()
-        
-        # Release resources
-        video.release()
-        writer.release()
+                
+                window.after(20, poll_pipeline)
+                return
+            
+            try:
+                if pipeline.error is not None:
+                    raise pipeline.error
+                
+                # Display success message, and which stage held the others back
+                error_label.config(text="Video enhanced successfully!")
+                progress_label.config(text=pipeline.summary())
+                
+            except Exception as e:
+                # Print the error message to the terminal
+                print(f"Error: {str(e)}")
+                
+            finally:
+                # Release resources, also after a failure
+                video.release()
+                writer.release()
         
-        # Display success message
-        error_label.config(text="Video enhanced successfully!")
-        progress_label.config(text="")
+        poll_pipeline()
         
     except Exception as e:
         # Print the error message to the terminal
@@ -138,6 +300,10 @@ enhance_button.pack()
 progress_label = tk.Label(window, text="")
 progress_label.pack()
 
+# Error label
+error_label = tk.Label(window, text="")
+error_label.pack()
+
 # Preview window
 preview_interval = 10  # Interval between preview updates (in frames)
 preview_label = tk.Label(window)
@@ -146,5 +312,8 @@ preview_label.pack()
 # Kernel for sharpening
 sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
 
+# Enhancement threads next to the reader and writer threads
+enhance_workers = max(1, (os.cpu_count() or 3) - 2)
+
 # Start the GUI main loop
 window.mainloop()
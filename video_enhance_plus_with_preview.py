@@ -47,9 +47,10 @@ def enhance_video():
                 hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
                 enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
                 
-                # Apply sharpening to the frame
-                sharpened_frame = cv2.filter2D(enhanced_frame, -1, sharpening_kernel * sharpen_value)
-                enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
+                # Apply sharpening to the frame; at zero it would leave the frame as it is
+                if sharpen_value != 0:
+                    sharpened_frame = cv2.filter2D(enhanced_frame, -1, sharpening_kernel * sharpen_value)
+                    enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
                 
                 # Write the enhanced frame to the output video file
                 writer.write(enhanced_frame)
@@ -111,8 +111,10 @@ class VideoEnhancer:
         hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
         enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
 
-        sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
-        enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
+        # Zero sharpening would leave the frame as it is, so the filter is skipped
+        if sharpen_value != 0:
+            sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
+            enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
 
         return enhanced_frame
 
@@ -1,3 +1,6 @@
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 from tkinter.ttk import Progressbar
@@ -5,6 +8,41 @@ import cv2
 import numpy as np
 from PIL import Image, ImageTk
 
+class ExportProgress:
+    # Progress of an export running on a worker thread. The export reports as often as it
+    # likes, but at most one event per interval goes into the queue that the Tk thread drains
+    # from after(), so the export never waits on a redraw.
+    def __init__(self, total, interval=0.1):
+        self.total = total
+        self.interval = interval
+        self.events = queue.Queue()
+        self.stage_times = {}
+        self.start_time = time.perf_counter()
+        self.last_event = 0.0
+
+    def lap(self, stage, since):
+        # Adds the time since `since` to the stage and returns now, to start timing the next one
+        now = time.perf_counter()
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + now - since
+        return now
+
+    def update(self, done):
+        now = time.perf_counter()
+        if now - self.last_event < self.interval:
+            return
+        self.last_event = now
+
+        elapsed = now - self.start_time
+        fps = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / fps if fps > 0 else None
+        self.events.put(("progress", done, fps, eta, dict(self.stage_times)))
+
+    def finish(self, message):
+        self.events.put(("done", message))
+
+    def fail(self, message):
+        self.events.put(("failed", message))
+
 class VideoEnhancer:
     def __init__(self):
         self.window = tk.Tk()
@@ -17,6 +55,10 @@ class VideoEnhancer:
         self.height = 0
         self.preview_window = None
 
+        # Export running on a worker thread and the progress it reports
+        self.export_thread = None
+        self.progress = None
+
         self.create_widgets()
 
     def create_widgets(self):
@@ -80,12 +122,17 @@ class VideoEnhancer:
             self.error_label.config(text="Please select a video.")
             return
 
+        if self.export_thread is not None and self.export_thread.is_alive():
+            self.error_label.config(text="An export is already running.")
+            return
+
         try:
-            self.video = cv2.VideoCapture(file_path)
-            self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.fps = self.video.get(cv2.CAP_PROP_FPS)
-            self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
-            self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # The export has its own capture, so the preview can't take it over
+            video = cv2.VideoCapture(file_path)
+            self.frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = video.get(cv2.CAP_PROP_FPS)
+            self.width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
             output_file = file_path.rsplit(".", 1)[0] + "_enhanced_Plus_video.mp4"
             fourcc = cv2.VideoWriter_fourcc(*"mp4v")
@@ -93,37 +140,82 @@ class VideoEnhancer:
 
             self.progress_bar["maximum"] = self.frame_count
 
-            for frame_index in range(self.frame_count):
-                ret, frame = self.video.read()
-
-                if ret:
-                    enhanced_frame = self.apply_enhancements(frame)
-                    writer.write(enhanced_frame)
-                
-                self.progress_bar["value"] = frame_index + 1
-                self.window.update()
-
-            self.video.release()
-            writer.release()
-
-            self.error_label.config(text="Video enhanced successfully!")
+            # The frames are enhanced on a worker thread, with the slider values read here
+            self.progress = ExportProgress(self.frame_count)
+            self.export_thread = threading.Thread(target=self.export_frames, args=(video, writer, self.frame_count, self.slider_values()), daemon=True)
+            self.export_thread.start()
+            self.poll_progress()
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def apply_enhancements(self, frame):
-        brightness_value = self.brightness_slider.get()
-        contrast_value = self.contrast_slider.get()
-        saturation_value = self.saturation_slider.get()
-        sharpen_value = self.sharpen_slider.get()
+    def export_frames(self, video, writer, frame_count, values):
+        try:
+            try:
+                for frame_index in range(frame_count):
+                    lap = time.perf_counter()
+                    ret, frame = video.read()
+                    lap = self.progress.lap("decode", lap)
+
+                    if ret:
+                        enhanced_frame = self.apply_enhancements(frame, values)
+                        lap = self.progress.lap("enhance", lap)
+                        writer.write(enhanced_frame)
+                        self.progress.lap("encode", lap)
+
+                    self.progress.update(frame_index + 1)
+            finally:
+                # Also after a failure, so the writer finishes what it has of the file
+                video.release()
+                writer.release()
+
+            self.progress.finish("Video enhanced successfully!")
+
+        except Exception as e:
+            self.progress.fail(f"Error: {str(e)}")
+
+    def poll_progress(self):
+        # Drains the export's events on the Tk thread; the export never touches Tk itself
+        while True:
+            try:
+                event = self.progress.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event[0] == "progress":
+                _, done, fps, eta, stage_times = event
+                text = f"Processing: {done * 100 // max(self.progress.total, 1)}% ({fps:.1f} fps" + (f", {eta:.0f} s left)" if eta is not None else ")")
+                if stage_times:
+                    text += "\n" + ", ".join(f"{stage} {seconds:.1f} s" for stage, seconds in stage_times.items())
+                self.progress_label.config(text=text)
+                self.progress_bar["value"] = done
+            elif event[0] == "done":
+                self.progress_label.config(text="Processing: 100%")
+                self.progress_bar["value"] = self.progress.total
+                self.error_label.config(text=event[1])
+                return
+            else:
+                self.error_label.config(text=event[1])
+                return
+
+        self.window.after(100, self.poll_progress)
+
+    def slider_values(self):
+        return (self.brightness_slider.get(), self.contrast_slider.get(), self.saturation_slider.get(), self.sharpen_slider.get())
+
+    def apply_enhancements(self, frame, values=None):
+        # Worker threads pass the values in, since only the Tk thread may read the sliders
+        brightness_value, contrast_value, saturation_value, sharpen_value = values or self.slider_values()
 
         enhanced_frame = cv2.convertScaleAbs(frame, alpha=contrast_value, beta=brightness_value)
         hsv_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2HSV)
         hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
         enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
 
-        sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
-        enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
+        # Zero sharpening would leave the frame as it is, so the filter is skipped
+        if sharpen_value != 0:
+            sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
+            enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
 
         return enhanced_frame
 
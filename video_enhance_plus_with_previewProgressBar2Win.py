@@ -1,9 +1,527 @@
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 from tkinter.ttk import Progressbar
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
+
+# Encoder choices: None is cv2's mp4v, the rest are (ffmpeg codec, preset)
+ENCODER_PRESETS = {
+    "mp4v (OpenCV)": None,
+    "MPEG-4 (ffmpeg)": ("mpeg4", None),
+    "H.264 ultrafast": ("libx264", "ultrafast"),
+    "H.264 veryfast": ("libx264", "veryfast"),
+    "H.264 medium": ("libx264", "medium"),
+    "H.265 medium": ("libx265", "medium"),
+}
+
+def open_writer(encoder, path, fps, size, threads=0):
+    preset = ENCODER_PRESETS[encoder]
+    if preset is None:
+        return OpenCVWriter(path, fps, size)
+    codec, speed = preset
+    return FfmpegWriter(path, fps, size, codec, speed, threads)
+
+def encode_report(path, frames, seconds):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    fps = frames / seconds if seconds else 0.0
+    return f"{frames} frames encoded at {fps:.1f} fps, {size / 1e6:.1f} MB written"
+
+class OpenCVWriter:
+    # cv2.VideoWriter; encoding happens inside write(), so the time spent there is the encode time
+    def __init__(self, path, fps, size, fourcc="mp4v"):
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        self.frames = 0
+        self.seconds = 0.0
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self.writer.write(frame)
+        self.seconds += time.perf_counter() - start
+        self.frames += 1
+
+    def release(self):
+        start = time.perf_counter()
+        self.writer.release()
+        self.seconds += time.perf_counter() - start
+
+    def report(self):
+        return encode_report(self.path, self.frames, self.seconds)
+
+class FfmpegWriter:
+    # An ffmpeg process fed raw frames over a pipe. It encodes alongside the caller,
+    # so the encode time runs from the first frame until ffmpeg exits.
+    def __init__(self, path, fps, size, codec="libx264", preset="veryfast", threads=0, pix_fmt="bgr24"):
+        self.path = path
+        self.frames = 0
+        self.start = None
+        self.seconds = 0.0
+
+        command = [
+            "ffmpeg", "-v", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+            "-c:v", codec, "-threads", str(threads), "-pix_fmt", "yuv420p",
+        ]
+        if preset is not None:
+            command += ["-preset", preset]
+        if codec == "mpeg4":
+            # Same quality scale as the mp4v fourcc used by cv2.VideoWriter
+            command += ["-q:v", "3"]
+        command.append(path)
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.process.stdin.write(frame)
+        self.frames += 1
+
+    def release(self):
+        self.process.stdin.close()
+        self.process.wait()
+        if self.start is not None:
+            self.seconds = time.perf_counter() - self.start
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}")
+
+    def report(self):
+        return encode_report(self.path, self.frames, self.seconds)
+
+class FrameCache:
+    # Decoded frames of recently used videos, stored as raw uint8 files and read back through
+    # np.memmap, so later passes over the same file come from the page cache instead of the decoder.
+    # The least recently used entries are evicted once the cache would grow past max_bytes.
+    def __init__(self, directory=None, max_bytes=4 * 1024 ** 3):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "video_enhancer_cache")
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, file_path):
+        # A changed file gets a new entry
+        stat = os.stat(file_path)
+        source = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def open(self, file_path):
+        key = self.key(file_path)
+        data_path = os.path.join(self.directory, key + ".u8")
+        meta_path = os.path.join(self.directory, key + ".json")
+
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            frames = np.memmap(data_path, np.uint8, "r", shape=tuple(meta["shape"]))
+            # The metadata file's mtime is the entry's last use
+            os.utime(meta_path)
+            return CachedCapture(frames, meta["fps"])
+        except (OSError, ValueError, KeyError):
+            return RecordingCapture(cv2.VideoCapture(file_path), self, data_path, meta_path)
+
+    def make_room(self, size):
+        if size > self.max_bytes:
+            return False
+
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".part") and time.time() - os.path.getmtime(path) > 3600:
+                    # Left behind by a pass that never finished
+                    os.remove(path)
+                elif name.endswith(".json"):
+                    data_path = path[:-len(".json")] + ".u8"
+                    entries.append((os.path.getmtime(path), path, data_path, os.path.getsize(data_path)))
+            except OSError:
+                continue
+
+        used = sum(entry[3] for entry in entries)
+        for _, meta_path, data_path, data_size in sorted(entries):
+            if used + size <= self.max_bytes:
+                break
+            try:
+                os.remove(meta_path)
+                os.remove(data_path)
+            except OSError:
+                continue
+            used -= data_size
+
+        return used + size <= self.max_bytes
+
+class CachedCapture:
+    # Plays a cache entry back through the cv2.VideoCapture calls the windows use
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def get(self, prop):
+        properties = {
+            cv2.CAP_PROP_FRAME_COUNT: len(self.frames),
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: self.frames.shape[2],
+            cv2.CAP_PROP_FRAME_HEIGHT: self.frames.shape[1],
+            cv2.CAP_PROP_POS_FRAMES: self.position,
+        }
+        return float(properties.get(prop, 0))
+
+    def read(self, image=None):
+        if self.frames is None or self.position >= len(self.frames):
+            return False, None
+
+        # The frame is a read-only view of the mapped file unless the caller brings a buffer
+        frame = self.frames[self.position]
+        self.position += 1
+        if image is not None:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def grab(self):
+        if self.frames is None or self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+
+    def release(self):
+        self.frames = None
+
+class RecordingCapture:
+    # cv2.VideoCapture that decodes straight into a new cache entry. The entry is kept only
+    # if the pass reads the whole file; otherwise it's thrown away on release.
+    def __init__(self, video, cache, data_path, meta_path):
+        self.video = video
+        self.data_path = data_path
+        self.meta_path = meta_path
+        self.frames = None
+        self.position = 0
+        self.ended = False
+
+        count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        shape = (count, int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        if count > 0 and cache.make_room(int(np.prod(shape))):
+            handle, self.part_path = tempfile.mkstemp(".part", dir=cache.directory)
+            os.close(handle)
+            self.frames = np.memmap(self.part_path, np.uint8, "w+", shape=shape)
+
+    def isOpened(self):
+        return self.video.isOpened()
+
+    def get(self, prop):
+        return self.video.get(prop)
+
+    def read(self, image=None):
+        if self.frames is None:
+            return self.video.read(image)
+
+        if self.position == len(self.frames):
+            ret, frame = self.video.read(image)
+            if ret:
+                # More frames than the container said, so this entry can't hold the whole file
+                self.discard()
+            else:
+                self.ended = True
+                self.finish()
+            return ret, frame
+
+        ret, frame = self.video.read(self.frames[self.position])
+        if not ret:
+            self.ended = True
+            self.finish()
+            return False, None
+
+        self.position += 1
+        if image is not None:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def grab(self):
+        # Every frame has to go into the entry, so skipping one still decodes it
+        return self.read()[0]
+
+    def release(self):
+        self.finish()
+        self.video.release()
+
+    def finish(self):
+        if self.frames is None:
+            return
+
+        # The frame count from the container can be off, so check the decoder really is at the end
+        complete = self.position > 0 and (self.ended or (self.position == len(self.frames) and not self.video.grab()))
+        if not complete:
+            self.discard()
+            return
+
+        shape = (self.position,) + self.frames.shape[1:]
+        self.frames.flush()
+        self.frames = None
+        try:
+            os.replace(self.part_path, self.data_path)
+            with open(self.meta_path, "w") as meta_file:
+                json.dump({"shape": shape, "fps": self.video.get(cv2.CAP_PROP_FPS)}, meta_file)
+        except OSError:
+            pass
+
+    def discard(self):
+        self.frames = None
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+class PreviewPlayer:
+    # Plays a video from after() callbacks, so the Tk main loop keeps running while it plays.
+    # A worker thread decodes and renders ahead on the file's own clock, and skips frames that
+    # are already late. A frame rendered with older slider values than the current ones is
+    # rendered again just before it is shown, so slider changes show up on the next frame.
+    def __init__(self, window, video, render, show, get_params, fps, queue_size=2):
+        self.window = window
+        self.video = video
+        self.render = render
+        self.show = show
+        self.get_params = get_params
+        self.fps = fps if fps > 0 else 30
+        self.frames = queue.Queue(queue_size)
+        self.render_lock = threading.Lock()
+        # render() hands back the enhancer's scratch buffers, which the next render overwrites,
+        # so rendered frames are copied out: into a ring of slots for the queued ones (the queue,
+        # the pending and the shown frame, and the one being put), and one for a redraw on tick()
+        self.slots = [None] * (queue_size + 3)
+        self.redraw = None
+        self.params = None
+        self.pending = None
+        self.last_frame = None
+        self.last_params = None
+        self.running = False
+        self.start_time = 0.0
+        self.after_id = None
+        self.shown = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    def start(self):
+        self.params = self.get_params()
+        self.running = True
+        self.start_time = time.perf_counter()
+        threading.Thread(target=self.produce, daemon=True).start()
+        self.tick()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.window.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+        elapsed = time.perf_counter() - self.start_time
+        print(f"Preview: {self.shown} frames shown ({self.shown / elapsed:.1f} fps), {self.dropped + self.skipped} dropped")
+
+    def due_index(self):
+        return int((time.perf_counter() - self.start_time) * self.fps)
+
+    def produce(self):
+        index = 0
+        rendered = 0
+        while self.running:
+            # Frames whose time has passed are skipped without being decoded into an image
+            while index < self.due_index() and self.video.grab():
+                index += 1
+                self.skipped += 1
+
+            ret, frame = self.video.read()
+            if not ret:
+                break
+
+            params = self.params
+            slot = rendered % len(self.slots)
+            with self.render_lock:
+                self.slots[slot] = image = self.keep(self.render(frame, params), self.slots[slot])
+            self.put((index, frame, params, image))
+            index += 1
+            rendered += 1
+
+        self.put((None, None, None, None))
+        self.video.release()
+
+    def keep(self, image, buffer):
+        # A render may also hand back several views (side by side compare), each kept on its own
+        if isinstance(image, tuple):
+            return tuple(self.keep(view, old) for view, old in zip(image, buffer or (None,) * len(image)))
+        if buffer is None or buffer.shape != image.shape:
+            buffer = np.empty_like(image)
+        np.copyto(buffer, image)
+        return buffer
+
+    def put(self, item):
+        while self.running:
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def tick(self):
+        self.after_id = None
+        if not self.running:
+            return
+
+        self.params = self.get_params()
+        due = self.due_index()
+
+        # Take the newest frame that is due; any older ones are late and dropped
+        latest = None
+        ended = False
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.frames.get_nowait()
+                except queue.Empty:
+                    break
+            if self.pending[0] is None:
+                ended = True
+                break
+            if self.pending[0] > due:
+                break
+            if latest is not None:
+                self.dropped += 1
+            latest, self.pending = self.pending, None
+
+        # Nothing new to show, but the sliders moved: show the current frame with the new values
+        if latest is None and self.last_frame is not None and self.last_params != self.params:
+            latest = (None, self.last_frame, self.last_params, None)
+
+        if latest is not None:
+            _, frame, params, image = latest
+            if params != self.params:
+                with self.render_lock:
+                    self.redraw = image = self.keep(self.render(frame, self.params), self.redraw)
+            self.show(image)
+            self.last_frame, self.last_params = frame, self.params
+            if latest[0] is not None:
+                self.shown += 1
+
+        if ended:
+            self.stop()
+            return
+
+        # Wake up when the next frame is due
+        delay = self.start_time + (due + 1) / self.fps - time.perf_counter()
+        self.after_id = self.window.after(max(1, int(delay * 1000)), self.tick)
+
+class PhotoSink:
+    # One persistent Tk image fed from a preallocated PPM buffer. A frame is converted to RGB
+    # straight into the buffer's pixel area and handed to Tk in one put(), instead of going
+    # through a PIL image and a new PhotoImage for every frame.
+    def __init__(self, master, width, height):
+        header = b"P6 %d %d 255\n" % (width, height)
+        self.buffer = bytearray(len(header) + width * height * 3)
+        self.buffer[:len(header)] = header
+        self.pixels = np.frombuffer(self.buffer, np.uint8, offset=len(header)).reshape(height, width, 3)
+        self.size = (width, height)
+        self.image = tk.PhotoImage(master=master, width=width, height=height)
+
+    def show(self, frame):
+        # frame is BGR; frames of another size are scaled to the sink
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.pixels)
+
+        # _tkinter only passes bytes through as binary data, so this is the one copy left
+        self.image.put(bytes(self.buffer))
+
+class FrameBus:
+    # One decoder feeding several consumers, each on its own thread at its own pace.
+    # A lossy consumer holds at most queue_size frames and drops the oldest when it falls
+    # behind, so a slow preview never holds up the export. A lossless one (the encoder)
+    # gets every frame and holds up the decoder instead.
+    def __init__(self):
+        self.consumers = []
+
+    def subscribe(self, name, handle, queue_size=1, lossless=False):
+        consumer = FrameConsumer(name, handle, queue_size, lossless)
+        self.consumers.append(consumer)
+        return consumer
+
+    def start(self):
+        for consumer in self.consumers:
+            consumer.thread.start()
+
+    def publish(self, index, frame):
+        # Consumers share the frame, so none of them may write into it
+        for consumer in self.consumers:
+            consumer.offer((index, frame))
+
+    def close(self):
+        # Each consumer finishes what it has queued before its thread ends; the end marker
+        # waits for room rather than pushing out the last frame
+        for consumer in self.consumers:
+            consumer.items.put(None)
+        for consumer in self.consumers:
+            consumer.thread.join()
+
+        for consumer in self.consumers:
+            if consumer.error is not None:
+                raise consumer.error
+
+    def report(self):
+        return ", ".join(f"{consumer.name} {consumer.handled} frames ({consumer.dropped} dropped)" for consumer in self.consumers)
+
+class FrameConsumer:
+    def __init__(self, name, handle, queue_size, lossless):
+        self.name = name
+        self.handle = handle
+        self.lossless = lossless
+        self.items = queue.Queue(queue_size)
+        self.handled = 0
+        self.dropped = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def offer(self, item):
+        if self.lossless:
+            self.items.put(item)
+            return
+
+        while True:
+            try:
+                self.items.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.items.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        while True:
+            item = self.items.get()
+            if item is None:
+                return
+
+            # After a failure keep draining, so the decoder doesn't wait on this consumer
+            if self.error is not None:
+                continue
+
+            try:
+                self.handle(*item)
+                self.handled += 1
+            except Exception as e:
+                self.error = e
 
 class VideoEnhancer:
     def __init__(self):
@@ -17,6 +535,25 @@ class VideoEnhancer:
         self.height = 0
         self.preview_window_original = None
         self.preview_window_modified = None
+        self.original_player = None
+        self.modified_player = None
+        self.compare_player = None
+
+        # Apply export: its thread, and what its consumers last left for the main thread
+        self.export_thread = None
+        self.export_result = None
+        self.latest_preview = None
+        self.latest_histogram = None
+        self.frames_done = 0
+
+        # Where the wipe view switches from the original to the modified frame, 0 to 1
+        self.wipe_position = 0.5
+
+        # Threads for the ffmpeg encoders, 0 lets ffmpeg decide
+        self.encoder_threads = 0
+
+        # Decoded frames shared by the preview and export passes
+        self.frame_cache = FrameCache()
 
         self.create_widgets()
 
@@ -47,6 +584,16 @@ class VideoEnhancer:
         self.sharpen_slider = tk.Scale(self.window, from_=0, to=1.0, resolution=0.1, orient=tk.HORIZONTAL, length=200)
         self.sharpen_slider.pack()
 
+        encoder_label = tk.Label(self.window, text="Encoder")
+        encoder_label.pack()
+        self.encoder_var = tk.StringVar(value="mp4v (OpenCV)")
+        encoder_menu = tk.OptionMenu(self.window, self.encoder_var, *ENCODER_PRESETS)
+        encoder_menu.pack()
+
+        self.cache_var = tk.BooleanVar(value=False)
+        cache_checkbox = tk.Checkbutton(self.window, text="Cache decoded frames", variable=self.cache_var)
+        cache_checkbox.pack()
+
         enhance_button = tk.Button(self.window, text="Enhance Video", command=self.enhance_video)
         enhance_button.pack()
 
@@ -59,6 +606,15 @@ class VideoEnhancer:
         apply_preview_button = tk.Button(self.window, text="Apply", command=self.apply_preview)
         apply_preview_button.pack()
 
+        compare_label = tk.Label(self.window, text="Compare")
+        compare_label.pack()
+        self.compare_var = tk.StringVar(value="Two windows")
+        compare_menu = tk.OptionMenu(self.window, self.compare_var, "Two windows", "Split screen", "Wipe")
+        compare_menu.pack()
+
+        compare_button = tk.Button(self.window, text="Compare", command=self.preview_compare)
+        compare_button.pack()
+
         self.error_label = tk.Label(self.window, text="")
         self.error_label.pack()
 
@@ -71,6 +627,10 @@ class VideoEnhancer:
         self.progress_bar = Progressbar(self.window, mode="determinate")
         self.progress_bar.pack()
 
+        # Histogram of the frames being exported
+        self.histogram_label = tk.Label(self.window)
+        self.histogram_label.pack()
+
     def select_video(self):
         file_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4")])
         self.file_var.set(file_path)
@@ -84,20 +644,20 @@ class VideoEnhancer:
             return
 
         try:
-            self.video = cv2.VideoCapture(file_path)
-            self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.fps = self.video.get(cv2.CAP_PROP_FPS)
-            self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
-            self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # The export keeps its own capture; the previews replace self.video while it runs
+            video = self.open_video(file_path)
+            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = video.get(cv2.CAP_PROP_FPS)
+            self.width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
             output_file = file_path.rsplit(".", 1)[0] + "_enhanced_Plus_video.mp4"
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            writer = cv2.VideoWriter(output_file, fourcc, self.fps, (self.width, self.height))
+            writer = open_writer(self.encoder_var.get(), output_file, self.fps, (self.width, self.height), self.encoder_threads)
 
-            self.progress_bar["maximum"] = self.frame_count
+            self.progress_bar["maximum"] = frame_count
 
-            for frame_index in range(self.frame_count):
-                ret, frame = self.video.read()
+            for frame_index in range(frame_count):
+                ret, frame = video.read()
 
                 if ret:
                     enhanced_frame = self.apply_enhancements(frame)
@@ -106,27 +666,36 @@ class VideoEnhancer:
                 self.progress_bar["value"] = frame_index + 1
                 self.window.update()
 
-            self.video.release()
+            video.release()
             writer.release()
 
-            self.error_label.config(text="Video enhanced successfully!")
+            self.error_label.config(text=f"Video enhanced successfully! {writer.report()}")
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def apply_enhancements(self, frame):
-        brightness_value = self.brightness_slider.get()
-        contrast_value = self.contrast_slider.get()
-        saturation_value = self.saturation_slider.get()
-        sharpen_value = self.sharpen_slider.get()
+    def open_video(self, file_path):
+        # With the cache on, only the first pass over a file runs the decoder
+        if self.cache_var.get():
+            return self.frame_cache.open(file_path)
+        return cv2.VideoCapture(file_path)
+
+    def slider_values(self):
+        return (self.brightness_slider.get(), self.contrast_slider.get(), self.saturation_slider.get(), self.sharpen_slider.get())
+
+    def apply_enhancements(self, frame, values=None):
+        # Worker threads pass the values in, since only the main thread may read the sliders
+        brightness_value, contrast_value, saturation_value, sharpen_value = values or self.slider_values()
 
         enhanced_frame = cv2.convertScaleAbs(frame, alpha=contrast_value, beta=brightness_value)
         hsv_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2HSV)
         hsv_frame[:, :, 1] = hsv_frame[:, :, 1] * saturation_value
         enhanced_frame = cv2.cvtColor(hsv_frame, cv2.COLOR_HSV2BGR)
 
-        sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
-        enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
+        # Zero sharpening would leave the frame as it is, so the filter is skipped
+        if sharpen_value != 0:
+            sharpened_frame = cv2.filter2D(enhanced_frame, -1, self.sharpening_kernel * sharpen_value)
+            enhanced_frame = cv2.addWeighted(enhanced_frame, 1 + sharpen_value, sharpened_frame, -sharpen_value, 0)
 
         return enhanced_frame
 
@@ -145,25 +714,22 @@ class VideoEnhancer:
                 self.preview_label_original = tk.Label(self.preview_window_original)
                 self.preview_label_original.pack()
 
-            self.video = cv2.VideoCapture(file_path)
+            self.video = self.open_video(file_path)
             self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
             self.fps = self.video.get(cv2.CAP_PROP_FPS)
             self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-            for frame_index in range(self.frame_count):
-                ret, frame = self.video.read()
-
-                if ret:
-                    preview_frame = cv2.resize(frame, (640, 320))
-                    preview_image = cv2.cvtColor(preview_frame, cv2.COLOR_BGR2RGB)
-                    preview_image = Image.fromarray(preview_image)
-                    preview_image = ImageTk.PhotoImage(preview_image)
-                    self.preview_label_original.config(image=preview_image)
-                    self.preview_label_original.image = preview_image
-                    self.preview_window_original.update()
-
-            self.video.release()
+            # Played from after() callbacks while the decoding runs on a worker thread
+            if self.original_player is not None:
+                self.original_player.stop()
+            self.original_player = PreviewPlayer(
+                self.preview_window_original, self.video, self.render_preview,
+                lambda preview_frame: self.show_preview(self.preview_label_original, preview_frame),
+                lambda: None, self.fps,
+            )
+            self.preview_window_original.bind("<Destroy>", lambda event: self.original_player.stop())
+            self.original_player.start()
 
         except Exception as e:
             print(f"Error: {str(e)}")
@@ -183,31 +749,41 @@ class VideoEnhancer:
                 self.preview_label_modified = tk.Label(self.preview_window_modified)
                 self.preview_label_modified.pack()
 
-            self.video = cv2.VideoCapture(file_path)
+            self.video = self.open_video(file_path)
             self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
             self.fps = self.video.get(cv2.CAP_PROP_FPS)
             self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-            for frame_index in range(self.frame_count):
-                ret, frame = self.video.read()
-
-                if ret:
-                    enhanced_frame = self.apply_enhancements(frame)
-                    preview_frame = cv2.resize(enhanced_frame, (640, 320))
-                    preview_image = cv2.cvtColor(preview_frame, cv2.COLOR_BGR2RGB)
-                    preview_image = Image.fromarray(preview_image)
-                    preview_image = ImageTk.PhotoImage(preview_image)
-                    self.preview_label_modified.config(image=preview_image)
-                    self.preview_label_modified.image = preview_image
-                    self.preview_window_modified.update()
-
-            self.video.release()
+            # Played from after() callbacks while the decoding runs on a worker thread
+            if self.modified_player is not None:
+                self.modified_player.stop()
+            self.modified_player = PreviewPlayer(
+                self.preview_window_modified, self.video, self.render_preview,
+                lambda preview_frame: self.show_preview(self.preview_label_modified, preview_frame),
+                self.slider_values, self.fps,
+            )
+            self.preview_window_modified.bind("<Destroy>", lambda event: self.modified_player.stop())
+            self.modified_player.start()
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def apply_preview(self):
+    def render_preview(self, frame, values):
+        # Runs on the player's worker thread; values is None for the original video
+        if values is not None:
+            frame = self.apply_enhancements(frame, values)
+        return cv2.resize(frame, (640, 320))
+
+    def show_preview(self, label, preview_frame):
+        # Each preview label gets one Tk image that every later frame is written into
+        size = (preview_frame.shape[1], preview_frame.shape[0])
+        if getattr(label, "sink", None) is None or label.sink.size != size:
+            label.sink = PhotoSink(label, *size)
+            label.config(image=label.sink.image)
+        label.sink.show(preview_frame)
+
+    def preview_compare(self):
         file_path = self.file_var.get()
 
         if not file_path:
@@ -215,52 +791,200 @@ class VideoEnhancer:
             return
 
         try:
-            if self.preview_window_modified is None:
+            if self.compare_player is not None:
+                self.compare_player.stop()
+            self.close_preview()
+
+            mode = self.compare_var.get()
+            if mode == "Two windows":
+                self.preview_window_original = tk.Toplevel()
+                self.preview_window_original.title("Preview (Original)")
+                self.preview_window_original.geometry("640x320")
+                self.preview_label_original = tk.Label(self.preview_window_original)
+                self.preview_label_original.pack()
+
                 self.preview_window_modified = tk.Toplevel()
                 self.preview_window_modified.title("Preview (Modified)")
                 self.preview_window_modified.geometry("640x320")
                 self.preview_label_modified = tk.Label(self.preview_window_modified)
                 self.preview_label_modified.pack()
 
-            self.video = cv2.VideoCapture(file_path)
+                def show(views):
+                    self.show_preview(self.preview_label_original, views[0])
+                    self.show_preview(self.preview_label_modified, views[1])
+            else:
+                self.preview_window_modified = tk.Toplevel()
+                self.preview_window_modified.title(f"Preview ({mode})")
+                self.preview_window_modified.geometry("1280x320" if mode == "Split screen" else "640x320")
+                self.preview_label_modified = tk.Label(self.preview_window_modified)
+                self.preview_label_modified.pack()
+
+                if mode == "Wipe":
+                    self.preview_label_modified.bind("<Motion>", self.move_wipe)
+
+                def show(view):
+                    self.show_preview(self.preview_label_modified, view)
+
+            self.video = self.open_video(file_path)
             self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
             self.fps = self.video.get(cv2.CAP_PROP_FPS)
             self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-            output_file = file_path.rsplit(".", 1)[0] + "_enhanced_Plus_video.mp4"
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            writer = cv2.VideoWriter(output_file, fourcc, self.fps, (self.width, self.height))
+            # One player decodes each frame once for both views, so they can't drift apart.
+            # The wipe position is part of its parameters, so moving it redraws the current frame.
+            self.compare_player = PreviewPlayer(
+                self.preview_window_modified, self.video,
+                lambda frame, params: self.render_compare(frame, params, mode), show,
+                lambda: (self.slider_values(), self.wipe_position), self.fps,
+            )
+            for window in (self.preview_window_original, self.preview_window_modified):
+                if window is not None:
+                    window.bind("<Destroy>", lambda event: self.compare_player.stop())
+            self.compare_player.start()
 
-            self.progress_bar["maximum"] = self.frame_count
+        except Exception as e:
+            print(f"Error: {str(e)}")
 
-            for frame_index in range(self.frame_count):
-                ret, frame = self.video.read()
+    def render_compare(self, frame, params, mode):
+        # Runs on the player's worker thread, with the values read on the main thread
+        values, wipe_position = params
+        original = self.render_preview(frame, None)
+        modified = self.render_preview(frame, values)
 
-                if ret:
-                    enhanced_frame = self.apply_enhancements(frame)
-                    writer.write(enhanced_frame)
+        if mode == "Split screen":
+            return cv2.hconcat([original, modified])
 
-                    if frame_index % 10 == 0:
-                        preview_frame = cv2.resize(enhanced_frame, (640, 320))
-                        preview_image = cv2.cvtColor(preview_frame, cv2.COLOR_BGR2RGB)
-                        preview_image = Image.fromarray(preview_image)
-                        preview_image = ImageTk.PhotoImage(preview_image)
-                        self.preview_label_modified.config(image=preview_image)
-                        self.preview_label_modified.image = preview_image
-                        self.preview_window_modified.update()
+        if mode == "Wipe":
+            x = int(wipe_position * modified.shape[1])
+            modified[:, :x] = original[:, :x]
+            cv2.line(modified, (x, 0), (x, modified.shape[0] - 1), (255, 255, 255), 1)
+            return modified
 
-                self.progress_bar["value"] = frame_index + 1
-                self.window.update()
+        return original, modified
 
-            self.video.release()
-            writer.release()
+    def move_wipe(self, event):
+        self.wipe_position = min(max(event.x / event.widget.winfo_width(), 0.0), 1.0)
 
-            self.error_label.config(text="Video enhanced successfully!")
+    def apply_preview(self):
+        file_path = self.file_var.get()
+
+        if not file_path:
+            self.error_label.config(text="Please select a video.")
+            return
+
+        if self.export_thread is not None and self.export_thread.is_alive():
+            self.error_label.config(text="An export is already running.")
+            return
+
+        try:
+            if self.preview_window_modified is None:
+                self.preview_window_modified = tk.Toplevel()
+                self.preview_window_modified.title("Preview (Modified)")
+                self.preview_window_modified.geometry("640x320")
+                self.preview_label_modified = tk.Label(self.preview_window_modified)
+                self.preview_label_modified.pack()
+
+            # The export keeps its own capture; the previews replace self.video while it runs
+            video = self.open_video(file_path)
+            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = video.get(cv2.CAP_PROP_FPS)
+            self.width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+            output_file = file_path.rsplit(".", 1)[0] + "_enhanced_Plus_video.mp4"
+            writer = open_writer(self.encoder_var.get(), output_file, self.fps, (self.width, self.height), self.encoder_threads)
+
+            self.progress_bar["maximum"] = frame_count
+            self.latest_preview = None
+            self.latest_histogram = None
+            self.frames_done = 0
+            self.export_result = None
+
+            # The decoder thread feeds the encoder and the preview, histogram and progress
+            # consumers; the main thread only picks up what they left behind
+            bus = FrameBus()
+            bus.subscribe("encoder", lambda frame_index, frame: writer.write(frame), queue_size=4, lossless=True)
+            bus.subscribe("preview", self.update_latest_preview)
+            bus.subscribe("histogram", self.update_latest_histogram)
+            bus.subscribe("progress", self.update_frames_done)
+
+            self.export_thread = threading.Thread(target=self.export_frames, args=(bus, writer, video, frame_count, self.slider_values()), daemon=True)
+            bus.start()
+            self.export_thread.start()
+            self.poll_export()
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
+    def export_frames(self, bus, writer, video, frame_count, values):
+        error = None
+        try:
+            for frame_index in range(frame_count):
+                ret, frame = video.read()
+
+                if ret:
+                    bus.publish(frame_index, self.apply_enhancements(frame, values))
+        except Exception as e:
+            error = e
+
+        # Also after a failure: the consumer threads get their end marker, and an ffmpeg
+        # writer's stdin is closed so its process exits. The first error is the one reported.
+        for close in (bus.close, video.release, writer.release):
+            try:
+                close()
+            except Exception as e:
+                error = error or e
+
+        if error is not None:
+            self.export_result = error
+        else:
+            self.export_result = f"{writer.report()}; frame bus: {bus.report()}"
+
+    def update_latest_preview(self, frame_index, frame):
+        self.latest_preview = cv2.resize(frame, (640, 320))
+
+    def update_latest_histogram(self, frame_index, frame):
+        self.latest_histogram = self.draw_histogram(frame)
+
+    def update_frames_done(self, frame_index, frame):
+        self.frames_done = frame_index + 1
+
+    def draw_histogram(self, frame, width=256, height=100):
+        # A quarter-size copy is plenty for the shape of the histogram
+        small = cv2.resize(frame, (frame.shape[1] // 4, frame.shape[0] // 4), interpolation=cv2.INTER_NEAREST)
+        image = np.zeros((height, width, 3), np.uint8)
+
+        for channel, color in enumerate([(255, 0, 0), (0, 255, 0), (0, 0, 255)]):
+            histogram = cv2.calcHist([small], [channel], None, [width], [0, 256]).ravel()
+            histogram = histogram / max(histogram.max(), 1) * (height - 1)
+            points = np.column_stack([np.arange(width), height - 1 - histogram]).astype(np.int32)
+            cv2.polylines(image, [points], False, color)
+
+        return image
+
+    def poll_export(self):
+        # Runs on the main thread, so this is the only place the export touches Tk.
+        # Checked first, so a finished export always shows its final state.
+        running = self.export_thread.is_alive()
+
+        preview, self.latest_preview = self.latest_preview, None
+        if preview is not None and self.preview_label_modified.winfo_exists():
+            self.show_preview(self.preview_label_modified, preview)
+
+        histogram, self.latest_histogram = self.latest_histogram, None
+        if histogram is not None:
+            self.show_preview(self.histogram_label, histogram)
+
+        self.progress_bar["value"] = self.frames_done
+
+        if running:
+            self.window.after(100, self.poll_export)
+        elif isinstance(self.export_result, Exception):
+            self.error_label.config(text=f"Error: {str(self.export_result)}")
+        else:
+            self.error_label.config(text=f"Video enhanced successfully! {self.export_result}")
+
     def close_preview(self):
         if self.preview_window_original is not None:
             self.preview_window_original.destroy()
@@ -1,15 +1,779 @@
+import argparse
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import tkinter as tk
+import weakref
+from multiprocessing import shared_memory
 from tkinter import filedialog
 from tkinter.ttk import Progressbar
 import cv2
 import numpy as np
 from PIL import Image, ImageTk
 
+class FrameContext:
+    # Scratch buffers for one frame size, allocated once when the video is opened
+    def __init__(self, width, height):
+        self.shape = (height, width)
+        self.frame = np.empty((height, width, 3), np.uint8)
+        self.planes = [np.empty((height, width), np.uint8) for _ in range(3)]
+        self.map_x = np.empty((height, width), np.float32)
+        self.map_y = np.empty((height, width), np.float32)
+        self.slice_offset = np.empty((height, width), np.float32)
+        self.color = np.empty((height, width, 3), np.uint8)
+        self.sharpened = np.empty((height, width, 3), np.uint8)
+        self.output = np.empty((height, width, 3), np.uint8)
+
+        # Stages that had to allocate instead of writing into their buffer
+        self.allocations = 0
+        self.frames = 0
+
+    def use(self, result, buffer):
+        if result is not buffer:
+            self.allocations += 1
+        return result
+
+    def end_frame(self, count=1):
+        self.frames += count
+
+    def allocations_per_frame(self):
+        return self.allocations / max(self.frames, 1)
+
+class KernelPlanner:
+    # Builds a filter kernel once per parameter value and picks how to run it.
+    # make_kernel returns None when the filter would leave the frame as it is.
+    def __init__(self, make_kernel):
+        self.make_kernel = make_kernel
+        self.value = None
+        self.plan = None
+
+    def get(self, value):
+        if self.plan is None or self.value != value:
+            self.plan = (self.plan_kernel(self.make_kernel(value)),)
+            self.value = value
+        return self.plan[0]
+
+    def plan_kernel(self, kernel):
+        if kernel is None:
+            return None
+
+        kernel = np.asarray(kernel, np.float32)
+        size = kernel.shape[0]
+        center = kernel[size // 2, size // 2]
+        identity = np.zeros_like(kernel)
+        identity[size // 2, size // 2] = 1
+        if np.array_equal(kernel, identity):
+            return None
+
+        # Small kernels are cheapest as a direct filter
+        if size <= 3:
+            return ("direct", kernel)
+
+        # center + box: one box filter, whatever the kernel size
+        outer = kernel[0, 0]
+        if np.count_nonzero(kernel != outer) <= 1:
+            return ("box", (float(center - outer), float(outer * size * size), size))
+
+        # Rank one: a row pass and a column pass
+        u, s, vt = np.linalg.svd(kernel)
+        if s[1] <= 1e-6 * s[0]:
+            return ("separable", ((vt[0] * s[0]).astype(np.float32), u[:, 0].astype(np.float32)))
+
+        return ("direct", kernel)
+
+    def run(self, frame, plan, dst=None):
+        kind, data = plan
+        if kind == "box":
+            identity_weight, box_weight, size = data
+            box = cv2.boxFilter(frame, cv2.CV_32F, (size, size))
+            return cv2.addWeighted(frame, identity_weight, box, box_weight, 0, dst, cv2.CV_8U)
+        if kind == "separable":
+            return cv2.sepFilter2D(frame, -1, data[0], data[1], dst)
+        return cv2.filter2D(frame, -1, data, dst)
+
+class FramePipeline:
+    # Decode -> enhance -> encode on separate threads joined by bounded queues.
+    # The writer puts results back in the order the reader produced them.
+    def __init__(self, read, process, write, workers=1, queue_size=8):
+        self.read = read
+        self.process = process
+        self.write = write
+        self.workers = workers
+        self.decoded = queue.Queue(queue_size)
+        self.enhanced = queue.Queue(queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.error = None
+        self.written = 0
+
+        # Seconds each stage spent working and waiting on its queues
+        self.stats = {stage: {"busy": 0.0, "stalled": 0.0} for stage in ("read", "enhance", "write")}
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.read_loop, daemon=True)]
+        self.threads += [threading.Thread(target=self.enhance_loop, daemon=True) for _ in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.write_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def run(self):
+        self.start()
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def record(self, stage, kind, start):
+        with self.lock:
+            self.stats[stage][kind] += time.perf_counter() - start
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+
+    def read_loop(self):
+        index = 0
+        try:
+            while self.error is None:
+                start = time.perf_counter()
+                item = self.read()
+                self.record("read", "busy", start)
+                if item is None:
+                    break
+
+                # Blocking here means the enhancement workers can't keep up
+                start = time.perf_counter()
+                self.decoded.put((index, item))
+                self.record("read", "stalled", start)
+                index += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.workers):
+                self.decoded.put(None)
+
+    def enhance_loop(self):
+        while True:
+            start = time.perf_counter()
+            job = self.decoded.get()
+            self.record("enhance", "stalled", start)
+            if job is None:
+                break
+
+            index, item = job
+            start = time.perf_counter()
+            try:
+                result = self.process(item)
+            except Exception as e:
+                self.fail(e)
+                continue
+            self.record("enhance", "busy", start)
+
+            start = time.perf_counter()
+            self.enhanced.put((index, result))
+            self.record("enhance", "stalled", start)
+
+        self.enhanced.put(None)
+
+    def write_loop(self):
+        pending = {}
+        next_index = 0
+        finished = 0
+        while finished < self.workers:
+            start = time.perf_counter()
+            job = self.enhanced.get()
+            self.record("write", "stalled", start)
+            if job is None:
+                finished += 1
+                continue
+
+            index, result = job
+            pending[index] = result
+            while next_index in pending:
+                result = pending.pop(next_index)
+                next_index += 1
+                if self.error is not None:
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    self.write(result)
+                except Exception as e:
+                    self.fail(e)
+                self.record("write", "busy", start)
+                self.written += 1
+
+    def summary(self):
+        # The stage that stalls the least (per thread) is the one holding the others back
+        threads = {"read": 1, "enhance": self.workers, "write": 1}
+        stalled = {stage: times["stalled"] / threads[stage] for stage, times in self.stats.items()}
+        lines = [f"{stage}: busy {times['busy']:.2f}s, stalled {times['stalled']:.2f}s" for stage, times in self.stats.items()]
+        limiting = min(stalled, key=stalled.get)
+        lines.append(f"limited by: {limiting}")
+        return "\n".join(lines)
+
+class SharedFrameRing:
+    # A fixed ring of frame slots in shared memory that worker processes enhance in place.
+    # Only slot numbers and slider values are pickled, never the pixels.
+    def __init__(self, width, height, make_engine, workers=1, slots=None):
+        self.shape = (height, width, 3)
+        self.slots = slots or 2 * workers + 2
+        self.shared = shared_memory.SharedMemory(create=True, size=self.slots * height * width * 3)
+        self.frames = np.ndarray((self.slots,) + self.shape, np.uint8, buffer=self.shared.buf)
+        self.tasks = WORKER_PROCESSES.Queue()
+        self.results = WORKER_PROCESSES.Queue()
+        self.free = list(range(self.slots))
+        self.pending = {}
+        self.next_index = 0
+        self.next_write = 0
+
+        self.processes = [
+            WORKER_PROCESSES.Process(target=enhance_slots, args=(self.shared.name, self.slots, self.shape, make_engine, self.tasks, self.results), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def run(self, read_into, params, write):
+        # read_into(buffer) decodes the next frame into a slot and returns False at the end.
+        # write(frame) gets the enhanced frames in decode order; the slot is reused after it returns.
+        while True:
+            while not self.free:
+                self.collect(write)
+
+            slot = self.free.pop()
+            if not read_into(self.frames[slot]):
+                self.free.append(slot)
+                break
+
+            self.tasks.put((slot, self.next_index, params))
+            self.next_index += 1
+
+        while self.next_write < self.next_index:
+            self.collect(write)
+
+    def collect(self, write, timeout=1.0):
+        # Waits in steps, so a worker that died (killed, out of memory) fails the export
+        # instead of leaving it waiting for a result that never comes
+        while True:
+            try:
+                slot, index, error = self.results.get(timeout=timeout)
+                break
+            except queue.Empty:
+                for process in self.processes:
+                    if not process.is_alive():
+                        raise RuntimeError(f"An enhance worker exited unexpectedly (exit code {process.exitcode}).")
+        if error is not None:
+            raise RuntimeError(error)
+
+        self.pending[index] = slot
+        while self.next_write in self.pending:
+            slot = self.pending.pop(self.next_write)
+            write(self.frames[slot])
+            self.free.append(slot)
+            self.next_write += 1
+
+    def close(self):
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join()
+
+        del self.frames
+        self.shared.close()
+        self.shared.unlink()
+
+class OpenCVWriter:
+    # cv2.VideoWriter; encoding happens inside write(), so the time spent there is the encode time
+    def __init__(self, path, fps, size, fourcc="mp4v"):
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        self.frames = 0
+        self.seconds = 0.0
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self.writer.write(frame)
+        self.seconds += time.perf_counter() - start
+        self.frames += 1
+
+    def release(self):
+        start = time.perf_counter()
+        self.writer.release()
+        self.seconds += time.perf_counter() - start
+
+    def report(self):
+        return encode_report(self.path, self.frames, self.seconds)
+
+class FfmpegWriter:
+    # An ffmpeg process fed raw frames over a pipe. It encodes alongside the caller,
+    # so the encode time runs from the first frame until ffmpeg exits.
+    def __init__(self, path, fps, size, codec="libx264", preset="veryfast", threads=0, pix_fmt="bgr24", output_pix_fmt="yuv420p", options=()):
+        self.path = path
+        self.frames = 0
+        self.start = None
+        self.seconds = 0.0
+
+        command = [
+            "ffmpeg", "-v", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+            "-c:v", codec, "-threads", str(threads), "-pix_fmt", output_pix_fmt,
+        ]
+        if preset is not None:
+            command += ["-preset", preset]
+        if codec == "mpeg4":
+            # Same quality scale as the mp4v fourcc used by cv2.VideoWriter
+            command += ["-q:v", "3"]
+        command += options
+        command.append(path)
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.process.stdin.write(frame)
+        self.frames += 1
+
+    def release(self):
+        self.process.stdin.close()
+        self.process.wait()
+        if self.start is not None:
+            self.seconds = time.perf_counter() - self.start
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}")
+
+    def report(self):
+        return encode_report(self.path, self.frames, self.seconds)
+
+class FrameCache:
+    # Decoded frames of recently used videos, stored as raw uint8 files and read back through
+    # np.memmap, so later passes over the same file come from the page cache instead of the decoder.
+    # The least recently used entries are evicted once the cache would grow past max_bytes.
+    def __init__(self, directory=None, max_bytes=4 * 1024 ** 3):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "video_enhancer_cache")
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Entries mapped by a CachedCapture or a frame read from one. Windows can't delete a
+        # mapped file, so these aren't evicted; the mapping goes away with its last reference.
+        self.mapped = weakref.WeakValueDictionary()
+
+    def key(self, file_path):
+        # A changed file gets a new entry
+        stat = os.stat(file_path)
+        source = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def open(self, file_path):
+        key = self.key(file_path)
+        data_path = os.path.join(self.directory, key + ".u8")
+        meta_path = os.path.join(self.directory, key + ".json")
+
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            frames = np.memmap(data_path, np.uint8, "r", shape=tuple(meta["shape"]))
+            self.mapped[data_path] = frames
+            # The metadata file's mtime is the entry's last use
+            os.utime(meta_path)
+            return CachedCapture(frames, meta["fps"])
+        except (OSError, ValueError, KeyError):
+            return RecordingCapture(cv2.VideoCapture(file_path), self, data_path, meta_path)
+
+    def make_room(self, size):
+        if size > self.max_bytes:
+            return False
+
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".part") and time.time() - os.path.getmtime(path) > 3600:
+                    # Left behind by a pass that never finished
+                    os.remove(path)
+                elif name.endswith(".json"):
+                    data_path = path[:-len(".json")] + ".u8"
+                    entries.append((os.path.getmtime(path), path, data_path, os.path.getsize(data_path)))
+            except OSError:
+                continue
+
+        used = sum(entry[3] for entry in entries)
+        for _, meta_path, data_path, data_size in sorted(entries):
+            if used + size <= self.max_bytes:
+                break
+            if data_path in self.mapped:
+                continue
+            try:
+                os.remove(meta_path)
+                os.remove(data_path)
+            except OSError:
+                continue
+            used -= data_size
+
+        return used + size <= self.max_bytes
+
+class CachedCapture:
+    # Plays a cache entry back through the cv2.VideoCapture calls the windows use
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def get(self, prop):
+        properties = {
+            cv2.CAP_PROP_FRAME_COUNT: len(self.frames),
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: self.frames.shape[2],
+            cv2.CAP_PROP_FRAME_HEIGHT: self.frames.shape[1],
+            cv2.CAP_PROP_POS_FRAMES: self.position,
+        }
+        return float(properties.get(prop, 0))
+
+    def read(self, image=None):
+        if self.frames is None or self.position >= len(self.frames):
+            return False, None
+
+        # The frame is a read-only view of the mapped file unless the caller brings a buffer
+        frame = self.frames[self.position]
+        self.position += 1
+        if image is not None:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def grab(self):
+        if self.frames is None or self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+
+    def set(self, prop, value):
+        # Seeking is only an index into the entry
+        if prop != cv2.CAP_PROP_POS_FRAMES or self.frames is None:
+            return False
+        self.position = min(max(int(value), 0), len(self.frames))
+        return True
+
+    def release(self):
+        # Frames already read keep the mapping alive until they are gone
+        self.frames = None
+
+class RecordingCapture:
+    # cv2.VideoCapture that decodes straight into a new cache entry. The entry is kept only
+    # if the pass reads the whole file; otherwise it's thrown away on release.
+    def __init__(self, video, cache, data_path, meta_path):
+        self.video = video
+        self.data_path = data_path
+        self.meta_path = meta_path
+        self.frames = None
+        self.position = 0
+        self.ended = False
+
+        count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        shape = (count, int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        if count > 0 and cache.make_room(int(np.prod(shape))):
+            handle, self.part_path = tempfile.mkstemp(".part", dir=cache.directory)
+            os.close(handle)
+            self.frames = np.memmap(self.part_path, np.uint8, "w+", shape=shape)
+
+    def isOpened(self):
+        return self.video.isOpened()
+
+    def get(self, prop):
+        return self.video.get(prop)
+
+    def read(self, image=None):
+        if self.frames is None:
+            return self.video.read(image)
+
+        if self.position == len(self.frames):
+            ret, frame = self.video.read(image)
+            if ret:
+                # More frames than the container said, so this entry can't hold the whole file
+                self.discard()
+            else:
+                self.ended = True
+                self.finish()
+            return ret, frame
+
+        ret, frame = self.video.read(self.frames[self.position])
+        if not ret:
+            self.ended = True
+            self.finish()
+            return False, None
+
+        # The caller gets a copy, never a view of the entry, so the mapping can be closed
+        # before the file is renamed or removed
+        self.position += 1
+        if image is None:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def grab(self):
+        # Every frame has to go into the entry, so skipping one still decodes it
+        return self.read()[0]
+
+    def set(self, prop, value):
+        # A seek leaves a gap in the entry, so it's given up and the decoder seeks as usual
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.discard()
+        return self.video.set(prop, value)
+
+    def release(self):
+        self.finish()
+        self.video.release()
+
+    def finish(self):
+        if self.frames is None:
+            return
+
+        # The frame count from the container can be off, so check the decoder really is at the end
+        complete = self.position > 0 and (self.ended or (self.position == len(self.frames) and not self.video.grab()))
+        if not complete:
+            self.discard()
+            return
+
+        shape = (self.position,) + self.frames.shape[1:]
+        self.frames.flush()
+        self.close()
+        try:
+            os.replace(self.part_path, self.data_path)
+            with open(self.meta_path, "w") as meta_file:
+                json.dump({"shape": shape, "fps": self.video.get(cv2.CAP_PROP_FPS)}, meta_file)
+        except OSError:
+            self.discard()
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+    def close(self):
+        # Windows can't rename or delete a file that is still mapped
+        if self.frames is not None:
+            frames, self.frames = self.frames, None
+            frames._mmap.close()
+
+class PreviewPlayer:
+    # Plays a video from after() callbacks, so the Tk main loop keeps running while it plays.
+    # A worker thread decodes and renders ahead on the file's own clock, and skips frames that
+    # are already late. A frame rendered with older slider values than the current ones is
+    # rendered again just before it is shown, so slider changes show up on the next frame.
+    def __init__(self, window, video, render, show, get_params, fps, queue_size=2):
+        self.window = window
+        self.video = video
+        self.render = render
+        self.show = show
+        self.get_params = get_params
+        self.fps = fps if fps > 0 else 30
+        self.frames = queue.Queue(queue_size)
+        self.render_lock = threading.Lock()
+        # render() hands back the enhancer's scratch buffers, which the next render overwrites,
+        # so rendered frames are copied out: into a ring of slots for the queued ones (the queue,
+        # the pending and the shown frame, and the one being put), and one for a redraw on tick()
+        self.slots = [None] * (queue_size + 3)
+        self.redraw = None
+        self.params = None
+        self.pending = None
+        self.last_frame = None
+        self.last_params = None
+        self.running = False
+        self.start_time = 0.0
+        self.after_id = None
+        self.shown = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    def start(self):
+        self.params = self.get_params()
+        self.running = True
+        self.start_time = time.perf_counter()
+        threading.Thread(target=self.produce, daemon=True).start()
+        self.tick()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.window.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+        elapsed = time.perf_counter() - self.start_time
+        print(f"Preview: {self.shown} frames shown ({self.shown / elapsed:.1f} fps), {self.dropped + self.skipped} dropped")
+
+    def due_index(self):
+        return int((time.perf_counter() - self.start_time) * self.fps)
+
+    def produce(self):
+        index = 0
+        rendered = 0
+        while self.running:
+            # Frames whose time has passed are skipped without being decoded into an image
+            while index < self.due_index() and self.video.grab():
+                index += 1
+                self.skipped += 1
+
+            ret, frame = self.video.read()
+            if not ret:
+                break
+
+            params = self.params
+            slot = rendered % len(self.slots)
+            with self.render_lock:
+                self.slots[slot] = image = self.keep(self.render(frame, params), self.slots[slot])
+            self.put((index, frame, params, image))
+            index += 1
+            rendered += 1
+
+        self.put((None, None, None, None))
+        self.video.release()
+
+    def keep(self, image, buffer):
+        # A render may also hand back several views (side by side compare), each kept on its own
+        if isinstance(image, tuple):
+            return tuple(self.keep(view, old) for view, old in zip(image, buffer or (None,) * len(image)))
+        if buffer is None or buffer.shape != image.shape:
+            buffer = np.empty_like(image)
+        np.copyto(buffer, image)
+        return buffer
+
+    def put(self, item):
+        while self.running:
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def tick(self):
+        self.after_id = None
+        if not self.running:
+            return
+
+        self.params = self.get_params()
+        due = self.due_index()
+
+        # Take the newest frame that is due; any older ones are late and dropped
+        latest = None
+        ended = False
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.frames.get_nowait()
+                except queue.Empty:
+                    break
+            if self.pending[0] is None:
+                ended = True
+                break
+            if self.pending[0] > due:
+                break
+            if latest is not None:
+                self.dropped += 1
+            latest, self.pending = self.pending, None
+
+        # Nothing new to show, but the sliders moved: show the current frame with the new values
+        if latest is None and self.last_frame is not None and self.last_params != self.params:
+            latest = (None, self.last_frame, self.last_params, None)
+
+        if latest is not None:
+            _, frame, params, image = latest
+            if params != self.params:
+                with self.render_lock:
+                    self.redraw = image = self.keep(self.render(frame, self.params), self.redraw)
+            self.show(image)
+            self.last_frame, self.last_params = frame, self.params
+            if latest[0] is not None:
+                self.shown += 1
+
+        if ended:
+            self.stop()
+            return
+
+        # Wake up when the next frame is due
+        delay = self.start_time + (due + 1) / self.fps - time.perf_counter()
+        self.after_id = self.window.after(max(1, int(delay * 1000)), self.tick)
+
+class ExportProgress:
+    # Progress of an export running on a worker thread. The export reports as often as it
+    # likes, but at most one event per interval goes into the queue that the Tk thread drains
+    # from after(), so the export never waits on a redraw.
+    def __init__(self, total, interval=0.1):
+        self.total = total
+        self.interval = interval
+        self.events = queue.Queue()
+        self.stage_times = {}
+        self.start_time = time.perf_counter()
+        self.last_event = 0.0
+
+    def lap(self, stage, since):
+        # Adds the time since `since` to the stage and returns now, to start timing the next one
+        now = time.perf_counter()
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + now - since
+        return now
+
+    def update(self, done, stage_times=None):
+        now = time.perf_counter()
+        if now - self.last_event < self.interval:
+            return
+        self.last_event = now
+
+        if stage_times is not None:
+            self.stage_times = stage_times
+        elapsed = now - self.start_time
+        fps = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / fps if fps > 0 else None
+        self.events.put(("progress", done, fps, eta, dict(self.stage_times)))
+
+    def finish(self, message):
+        self.events.put(("done", message))
+
+    def fail(self, message):
+        self.events.put(("failed", message))
+
+class PhotoSink:
+    # One persistent Tk image fed from a preallocated PPM buffer. A frame is converted to RGB
+    # straight into the buffer's pixel area and handed to Tk in one put(), instead of going
+    # through a PIL image and a new PhotoImage for every frame.
+    def __init__(self, master, width, height):
+        header = b"P6 %d %d 255\n" % (width, height)
+        self.buffer = bytearray(len(header) + width * height * 3)
+        self.buffer[:len(header)] = header
+        self.pixels = np.frombuffer(self.buffer, np.uint8, offset=len(header)).reshape(height, width, 3)
+        self.size = (width, height)
+        self.image = tk.PhotoImage(master=master, width=width, height=height)
+
+    def show(self, frame):
+        # frame is BGR; frames of another size are scaled to the sink
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.pixels)
+
+        # _tkinter only passes bytes through as binary data, so this is the one copy left
+        self.image.put(bytes(self.buffer))
+
 class VideoEnhancer:
-    def __init__(self):
-        self.window = tk.Tk()
-        self.window.title("Video Enhancer")
-        self.file_var = tk.StringVar()
+    def __init__(self, gui=True):
         self.video = None
         self.frame_count = 0
         self.fps = 0
@@ -17,8 +781,50 @@ class VideoEnhancer:
         self.height = 0
         self.preview_window_original = None
         self.preview_window_modified = None
+        self.preview_player = None
+
+        # Export running on a worker thread, its own capture, and the progress it reports
+        self.export_thread = None
+        self.export_video = None
+        self.progress = None
+
+        # 3D color LUT for the pointwise part of the enhancement chain
+        self.lut_size = 33
+        self.color_lut = None
+        self.color_lut_key = None
+
+        # Preallocated buffers for the current frame size
+        self.frame_context = None
 
-        self.create_widgets()
+        # Frames per batch come from this budget, or from the CPU cache size when it is None
+        self.batch_memory_budget = None
+        self.max_batch_size = 16
+
+        # Enhancement threads next to the reader and writer threads, and batches queued between stages
+        self.enhance_workers = max(1, (os.cpu_count() or 3) - 2)
+        self.pipeline_queue_size = 2
+
+        # Processes for the segment-parallel export, each decoding, enhancing and encoding its own time range
+        self.segment_workers = os.cpu_count() or 1
+
+        # Threads for the ffmpeg encoders, 0 lets ffmpeg decide
+        self.encoder_threads = 0
+
+        # Frames per committed segment in a resumable export
+        self.checkpoint_frames = 1500
+
+        # Decoded frames shared by the export and Apply passes
+        self.frame_cache = FrameCache()
+
+        self.sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+        self.sharpen_planner = make_sharpen_planner(self.sharpening_kernel)
+
+        # Worker processes build their enhancer without a window
+        if gui:
+            self.window = tk.Tk()
+            self.window.title("Video Enhancer")
+            self.file_var = tk.StringVar()
+            self.create_widgets()
 
     def create_widgets(self):
         select_button = tk.Button(self.window, text="Select Video", command=self.select_video)
@@ -47,6 +853,46 @@ class VideoEnhancer:
         self.sharpen_slider = tk.Scale(self.window, from_=0, to=1.0, resolution=0.1, orient=tk.HORIZONTAL, length=200)
         self.sharpen_slider.pack()
 
+        # Work on the decoder's YUV planes instead of BGR frames
+        self.yuv_var = tk.BooleanVar(value=False)
+        yuv_checkbox = tk.Checkbutton(self.window, text="Process in YUV (needs ffmpeg)", variable=self.yuv_var)
+        yuv_checkbox.pack()
+
+        # Enhance in separate processes instead of threads
+        self.processes_var = tk.BooleanVar(value=False)
+        processes_checkbox = tk.Checkbutton(self.window, text="Enhance in worker processes", variable=self.processes_var)
+        processes_checkbox.pack()
+
+        # Split the export into time ranges that are encoded side by side and joined afterwards
+        self.segments_var = tk.BooleanVar(value=False)
+        segments_checkbox = tk.Checkbutton(self.window, text="Export segments in parallel (needs ffmpeg)", variable=self.segments_var)
+        segments_checkbox.pack()
+
+        # Only re-encode the parts of the clip listed here; the rest is copied as it is
+        smart_label = tk.Label(self.window, text="Enhance only (seconds, e.g. 10-20, 45-60)")
+        smart_label.pack()
+        self.ranges_var = tk.StringVar()
+        ranges_entry = tk.Entry(self.window, textvariable=self.ranges_var, width=30)
+        ranges_entry.pack()
+        self.smart_var = tk.BooleanVar(value=False)
+        smart_checkbox = tk.Checkbutton(self.window, text="Smart render (needs ffmpeg)", variable=self.smart_var)
+        smart_checkbox.pack()
+
+        # Commit the export segment by segment, so a rerun picks up where it stopped
+        self.resumable_var = tk.BooleanVar(value=False)
+        resumable_checkbox = tk.Checkbutton(self.window, text="Resumable export (needs ffmpeg)", variable=self.resumable_var)
+        resumable_checkbox.pack()
+
+        encoder_label = tk.Label(self.window, text="Encoder")
+        encoder_label.pack()
+        self.encoder_var = tk.StringVar(value="mp4v (OpenCV)")
+        encoder_menu = tk.OptionMenu(self.window, self.encoder_var, *ENCODER_PRESETS)
+        encoder_menu.pack()
+
+        self.cache_var = tk.BooleanVar(value=False)
+        cache_checkbox = tk.Checkbutton(self.window, text="Cache decoded frames", variable=self.cache_var)
+        cache_checkbox.pack()
+
         enhance_button = tk.Button(self.window, text="Enhance Video", command=self.enhance_video)
         enhance_button.pack()
 
@@ -65,8 +911,6 @@ class VideoEnhancer:
         self.progress_label = tk.Label(self.window, text="")
         self.progress_label.pack()
 
-        self.sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-
         # Progress bar
         self.progress_bar = Progressbar(self.window, mode="determinate")
         self.progress_bar.pack()
@@ -83,12 +927,28 @@ class VideoEnhancer:
             self.error_label.config(text="Please select a video.")
             return
 
+        if self.export_thread is not None and self.export_thread.is_alive():
+            self.error_label.config(text="An export is already running.")
+            return
+
+        # The export modes don't combine, and choose_export would quietly run the first one
+        modes = [
+            name for var, name in (
+                (self.yuv_var, "YUV"), (self.processes_var, "worker processes"), (self.segments_var, "parallel segments"),
+                (self.smart_var, "smart render"), (self.resumable_var, "resumable"),
+            ) if var.get()
+        ]
+        if len(modes) > 1:
+            self.error_label.config(text=f"Pick one export mode, not {' and '.join(modes)}.")
+            return
+
         try:
-            self.video = cv2.VideoCapture(file_path)
-            self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.fps = int(self.video.get(cv2.CAP_PROP_FPS))
-            self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
-            self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.export_video = self.open_video(file_path)
+            self.frame_count = int(self.export_video.get(cv2.CAP_PROP_FRAME_COUNT))
+            # Exact, so 29.97 and 23.976 fps exports keep the source's timing
+            self.fps = self.export_video.get(cv2.CAP_PROP_FPS)
+            self.width = int(self.export_video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.export_video.get(cv2.CAP_PROP_FRAME_HEIGHT))
             self.error_label.config(text="")
         except Exception as e:
             self.error_label.config(text=f"Error: {str(e)}")
@@ -96,38 +956,726 @@ class VideoEnhancer:
 
         self.process_video()
 
+    def open_video(self, file_path):
+        # With the cache on, only the first pass over a file runs the decoder
+        if self.cache_var.get():
+            return self.frame_cache.open(file_path)
+        return cv2.VideoCapture(file_path)
+
     def process_video(self):
-        file_path = self.file_var.get()
-        brightness = self.brightness_slider.get()
-        contrast = self.contrast_slider.get()
-        saturation = self.saturation_slider.get()
-        sharpen = self.sharpen_slider.get()
+        # Runs on the Tk thread: the settings are read here, and the export runs on a worker
+        # thread that reports back through self.progress. The worker gets an enhancer of its
+        # own, so a preview opened meanwhile can't rebuild the LUT or reuse the buffers under it.
+        engine = self.export_engine()
+        export = self.choose_export(engine)
+        settings = (self.file_var.get(), self.slider_values(), self.encoder_var.get())
+        self.progress = engine.progress = ExportProgress(self.frame_count)
+        self.export_thread = threading.Thread(target=self.run_export, args=(export, settings), daemon=True)
+        self.export_thread.start()
+        self.poll_progress()
+
+    def export_engine(self):
+        # Windowless enhancer with the export's capture, video properties and tuning
+        engine = VideoEnhancer(gui=False)
+        for name in (
+            "export_video", "frame_count", "fps", "width", "height", "lut_size", "batch_memory_budget", "max_batch_size",
+            "enhance_workers", "pipeline_queue_size", "segment_workers", "encoder_threads", "checkpoint_frames",
+        ):
+            setattr(engine, name, getattr(self, name))
+        return engine
+
+    def choose_export(self, engine):
+        if self.yuv_var.get():
+            return engine.process_video_yuv
+        if self.processes_var.get():
+            return engine.process_video_processes
+        if self.segments_var.get():
+            return engine.process_video_segments
+        if self.resumable_var.get():
+            return engine.process_video_resumable
+        if self.smart_var.get():
+            return functools.partial(engine.process_video_smart, ranges_text=self.ranges_var.get())
+        return engine.process_video_threaded
+
+    def run_export(self, export, settings):
+        try:
+            export(*settings)
+        except Exception as e:
+            self.progress.fail(f"Error: {str(e)}")
+
+    def poll_progress(self):
+        # Drains the export's events on the Tk thread; nothing in the export touches Tk itself
+        while True:
+            try:
+                event = self.progress.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event[0] == "progress":
+                _, done, fps, eta, stage_times = event
+                progress = done / max(self.progress.total, 1) * 100
+                text = f"Processing: {int(progress)}% ({fps:.1f} fps" + (f", {eta:.0f} s left)" if eta is not None else ")")
+                if stage_times:
+                    text += "\n" + ", ".join(f"{stage} {seconds:.1f} s" for stage, seconds in stage_times.items())
+                self.progress_label.config(text=text)
+                self.progress_bar["value"] = progress
+            elif event[0] == "done":
+                self.progress_label.config(text="Processing: 100%")
+                self.progress_bar["value"] = 100
+                self.error_label.config(text=event[1])
+                self.preview_video_original()
+                return
+            else:
+                self.error_label.config(text=event[1])
+                return
+
+        self.window.after(100, self.poll_progress)
+
+    def process_video_threaded(self, file_path, params, encoder):
+        brightness, contrast, saturation, sharpen = params
+
+        output_file_path = "enhanced_video.mp4"
+
+        try:
+            output_video = open_writer(encoder, output_file_path, self.fps, (self.width, self.height), self.encoder_threads)
+        except OSError as e:
+            self.progress.fail(f"Error: {str(e)}")
+            return
+
+        # Frames are decoded into a stack with one spare row above and below each frame,
+        # and every stage runs once over the whole stack
+        batch_size = self.choose_batch_size(self.width, self.height)
+
+        # Batch buffers go round reader -> workers -> writer -> reader, so none are allocated per batch
+        free_batches = queue.Queue()
+        for _ in range(2 * self.pipeline_queue_size + self.enhance_workers + 2):
+            free_batches.put(np.empty((batch_size, self.height + 2, self.width, 3), np.uint8))
+
+        # Settle the LUT and kernel before the workers share them
+        self.compile_color_lut(brightness, contrast, saturation)
+        self.sharpen_planner.get(sharpen)
+
+        frames_read = 0
+        frames_written = 0
+        worker_state = threading.local()
+        worker_contexts = []
+
+        def read_batch():
+            nonlocal frames_read
+            if frames_read >= self.frame_count:
+                return None
+
+            batch = free_batches.get()
+            count = 0
+            while count < batch_size and frames_read < self.frame_count:
+                ret, _ = self.export_video.read(batch[count, 1:-1])
+                frames_read += 1
+                if ret:
+                    count += 1
+            return batch, count
+
+        def enhance_batch(job):
+            batch, count = job
+            # Each worker has its own scratch buffers
+            if not hasattr(worker_state, "context"):
+                worker_state.context = FrameContext(self.width, batch_size * (self.height + 2))
+                worker_contexts.append(worker_state.context)
+
+            if count:
+                enhanced = self.apply_enhancements_batch(batch, brightness, contrast, saturation, sharpen, worker_state.context)
+                np.copyto(batch, enhanced)
+            return batch, count
+
+        def write_batch(job):
+            nonlocal frames_written
+            batch, count = job
+            for frame in batch[:count, 1:-1]:
+                output_video.write(frame)
+            frames_written += count
+            free_batches.put(batch)
+
+        pipeline = FramePipeline(read_batch, enhance_batch, write_batch, self.enhance_workers, self.pipeline_queue_size)
+        pipeline.start()
+
+        while pipeline.is_alive():
+            self.progress.update(frames_written, {stage: stats["busy"] for stage, stats in pipeline.stats.items()})
+            time.sleep(0.02)
+
+        try:
+            output_video.release()
+        except RuntimeError as e:
+            pipeline.fail(e)
+        self.export_video.release()
+
+        if pipeline.error is not None:
+            self.progress.fail(f"Error: {str(pipeline.error)}")
+            return
+
+        allocations = sum(context.allocations for context in worker_contexts)
+        frames = sum(context.frames for context in worker_contexts)
+        print(f"Allocations per frame: {allocations / max(frames, 1):.2f}")
+        print(pipeline.summary())
+        self.progress.finish(f"Video enhancement completed ({output_video.report()}).")
+
+    def process_video_processes(self, file_path, params, encoder):
+        brightness, contrast, saturation, sharpen = params
+
+        output_file_path = "enhanced_video.mp4"
+
+        # Start the workers before the encoder, so they don't inherit its pipe and keep it open
+        ring = SharedFrameRing(self.width, self.height, functools.partial(VideoEnhancer, gui=False), self.enhance_workers)
+        try:
+            output_video = open_writer(encoder, output_file_path, self.fps, (self.width, self.height), self.encoder_threads)
+        except OSError as e:
+            ring.close()
+            self.progress.fail(f"Error: {str(e)}")
+            return
+
+        frames_read = 0
+        frames_written = 0
+
+        def read_into(buffer):
+            # Decode straight into the shared slot
+            nonlocal frames_read
+            while frames_read < self.frame_count:
+                frames_read += 1
+                ret, _ = self.export_video.read(buffer)
+                if ret:
+                    return True
+            return False
+
+        def write(frame):
+            nonlocal frames_written
+            start = time.perf_counter()
+            output_video.write(frame)
+            self.progress.lap("encode", start)
+            frames_written += 1
+
+            self.progress.update(frames_written)
+
+        try:
+            ring.run(read_into, (brightness, contrast, saturation, sharpen), write)
+            output_video.release()
+        except Exception as e:
+            self.progress.fail(f"Error: {str(e)}")
+            return
+        finally:
+            ring.close()
+            self.export_video.release()
+
+        self.progress.finish(f"Video enhancement completed ({output_video.report()}).")
+
+    def process_video_segments(self, file_path, params, encoder):
+
+        output_file_path = "enhanced_video.mp4"
+
+        # Every segment opens the file itself
+        self.export_video.release()
+
+        boundaries = self.plan_segments(file_path, self.frame_count, self.segment_workers)
+        ranges = list(zip(boundaries, boundaries[1:]))
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as segment_dir:
+            segment_paths = [os.path.join(segment_dir, f"segment_{i:04d}.mp4") for i in range(len(ranges))]
+
+            # Each process counts its written frames into its own entry
+            frames_written = WORKER_PROCESSES.Array("i", len(ranges))
+            processes = [
+                WORKER_PROCESSES.Process(target=export_segment, args=(file_path, start, end, path, params, self.fps, (self.width, self.height), encoder, frames_written, i), daemon=True)
+                for i, ((start, end), path) in enumerate(zip(ranges, segment_paths))
+            ]
+            for process in processes:
+                process.start()
+
+            while any(process.is_alive() for process in processes):
+                self.progress.update(sum(frames_written))
+                time.sleep(0.05)
+
+            failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+            if failed:
+                self.progress.fail(f"Error: segment {failed[0]} failed.")
+                return
+
+            try:
+                self.join_segments(segment_paths, output_file_path, segment_dir)
+            except (OSError, subprocess.CalledProcessError) as e:
+                self.progress.fail(f"Error: {str(e)}")
+                return
+
+        # The segments encode side by side, so this is the combined rate
+        report = encode_report(output_file_path, sum(frames_written), time.perf_counter() - start)
+        self.progress.finish(f"Video enhancement completed ({report}).")
+
+    def process_video_smart(self, file_path, params, encoder, ranges_text=""):
+
+        output_file_path = "enhanced_video.mp4"
+
+        # Re-encoded pieces have to match the copied ones for the join
+        codec, pixel_format = self.source_stream(file_path)
+        self.export_video.release()
+        if codec is None:
+            self.progress.fail("Error: smart render doesn't support this codec, use a normal export.")
+            return
+
+        try:
+            ranges = self.parse_ranges(ranges_text, self.fps, self.frame_count)
+        except ValueError:
+            self.progress.fail("Error: enhance ranges look like 10-20, 45-60 (seconds).")
+            return
+
+        # With identity settings there is nothing to enhance, and the whole file is copied.
+        # Otherwise no ranges is a mistake, not a request for an unchanged copy.
+        if params == (0, 1.0, 1.0, 0.0):
+            ranges = []
+        elif not ranges:
+            self.progress.fail("Error: enter the ranges to enhance, e.g. 10-20, 45-60 (seconds, inside the video).")
+            return
+
+        pieces = self.plan_smart_render(ranges, self.keyframe_indices(file_path, codec), self.frame_count)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            piece_paths = [os.path.join(work_dir, f"piece_{i:05d}.mp4") for i in range(len(pieces))]
+
+            # One pass splits the source at the piece boundaries without decoding it
+            split_frames = ",".join(str(start) for start, _, _ in pieces[1:])
+            command = ["ffmpeg", "-v", "error", "-y", "-i", file_path, "-map", "0:v:0", "-c", "copy", "-f", "segment", "-reset_timestamps", "1"]
+            if split_frames:
+                command += ["-segment_frames", split_frames]
+            command.append(os.path.join(work_dir, "piece_%05d.mp4"))
+
+            frames_to_encode = sum(end - start for start, end, enhance in pieces if enhance)
+            self.progress.total = frames_to_encode
+            frames_encoded = 0
+            try:
+                subprocess.run(command, check=True)
+
+                # A split the muxer didn't make would shift every piece after it
+                split_count = sum(name.startswith("piece_") for name in os.listdir(work_dir))
+                if split_count != len(pieces):
+                    raise RuntimeError(f"the split made {split_count} pieces instead of {len(pieces)}")
+
+                for i, (start, end, enhance) in enumerate(pieces):
+                    if not enhance:
+                        continue
+
+                    # Decode the piece, enhance the frames inside the ranges and encode it again in place of the copy
+                    enhanced_path = os.path.join(work_dir, f"enhanced_{i:05d}.mp4")
+                    video = cv2.VideoCapture(piece_paths[i])
+                    output_video = FfmpegWriter(
+                        enhanced_path, self.fps, (self.width, self.height), codec, None if codec == "mpeg4" else "medium",
+                        self.encoder_threads, output_pix_fmt=pixel_format, options=self.inband_header_options(codec),
+                    )
+                    for frame_index in range(start, end):
+                        lap = time.perf_counter()
+                        ret, frame = video.read()
+                        if not ret:
+                            break
+                        lap = self.progress.lap("decode", lap)
+                        if any(range_start <= frame_index < range_end for range_start, range_end in ranges):
+                            frame = self.apply_enhancements(frame, *params)
+                        lap = self.progress.lap("enhance", lap)
+                        output_video.write(frame)
+                        self.progress.lap("encode", lap)
+                        frames_encoded += 1
+
+                        self.progress.update(frames_encoded)
+                    video.release()
+                    output_video.release()
+                    piece_paths[i] = enhanced_path
+
+                self.join_segments(piece_paths, output_file_path, work_dir)
+            except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+                self.progress.fail(f"Error: {str(e)}")
+                return
+
+        self.progress.finish(f"Video enhancement completed.\nSmart render: {frames_encoded} of {self.frame_count} frames re-encoded, the rest copied")
+
+    def source_stream(self, file_path):
+        # ffmpeg encoder for the source's codec, or None when it isn't one we can match, and the
+        # decoder's pixel format. Asked of a capture of its own, since the frame cache's captures
+        # don't know either.
+        video = cv2.VideoCapture(file_path)
+        fourcc = int(video.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("latin-1").lower()
+        pixel_fourcc = int(video.get(cv2.CAP_PROP_CODEC_PIXEL_FORMAT)).to_bytes(4, "little").decode("latin-1")
+        video.release()
+        codecs = {
+            "mp4v": "mpeg4", "fmp4": "mpeg4", "xvid": "mpeg4", "divx": "mpeg4", "dx50": "mpeg4",
+            "avc1": "libx264", "h264": "libx264", "x264": "libx264",
+            "hev1": "libx265", "hvc1": "libx265", "hevc": "libx265",
+        }
+        codec = codecs.get(fourcc)
+
+        # mpeg4 only does 4:2:0, and anything we don't know is encoded as 4:2:0 too
+        pixel_formats = {"I420": "yuv420p", "Y42B": "yuv422p", "444P": "yuv444p"}
+        pixel_format = pixel_formats.get(pixel_fourcc, "yuv420p") if codec != "mpeg4" else "yuv420p"
+        return codec, pixel_format
+
+    def inband_header_options(self, codec):
+        # The concat join keeps only the first piece's out-of-band headers, and a re-encoded piece
+        # doesn't share the source's profile, level or reference settings. Repeating its headers
+        # at every keyframe lets a decoder switch over when the piece starts.
+        if codec == "libx264":
+            return ["-x264-params", "repeat-headers=1"]
+        if codec == "libx265":
+            return ["-x265-params", "repeat-headers=1:log-level=error"]
+        return ["-bsf:v", "dump_extra=freq=keyframe"]
+
+    def parse_ranges(self, text, fps, frame_count):
+        # "10-20, 45-60" in seconds -> [(250, 500), (1125, 1500)] in frames at 25 fps
+        ranges = []
+        for part in text.replace(";", ",").split(","):
+            if not part.strip():
+                continue
+            start, end = (float(value) for value in part.split("-"))
+            start_frame, end_frame = max(0, round(start * fps)), min(frame_count, round(end * fps))
+            if start_frame < end_frame:
+                ranges.append((start_frame, end_frame))
+        return sorted(ranges)
+
+    def plan_smart_render(self, ranges, keyframes, frame_count):
+        # Copied packets can only start at a keyframe, so every enhanced range grows out to the
+        # keyframes around it. Returns (start, end, enhance) pieces covering the whole file.
+        keyframes = keyframes or [0]
+        cuts = []
+        for start, end in ranges:
+            start = max(keyframe for keyframe in keyframes if keyframe <= start) if keyframes[0] <= start else 0
+            end = min((keyframe for keyframe in keyframes if keyframe >= end), default=frame_count)
+            if cuts and start <= cuts[-1][1]:
+                cuts[-1] = (cuts[-1][0], max(end, cuts[-1][1]))
+            else:
+                cuts.append((start, end))
+
+        pieces = []
+        position = 0
+        for start, end in cuts:
+            if position < start:
+                pieces.append((position, start, False))
+            pieces.append((start, end, True))
+            position = end
+        if position < frame_count:
+            pieces.append((position, frame_count, False))
+        return pieces
+
+    def process_video_resumable(self, file_path, params, encoder):
+        # A list, to compare equal to the journal's JSON copy
+        params = list(params)
 
         output_file_path = "enhanced_video.mp4"
 
-        output_video = cv2.VideoWriter(output_file_path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (self.width, self.height))
+        # Finished segments and the journal listing them stay next to the output until the final join
+        parts_dir = output_file_path + ".parts"
+        journal = self.load_journal(parts_dir, file_path, {"params": params, "encoder": encoder, "segment_frames": self.checkpoint_frames})
+
+        ranges = [(start, min(start + self.checkpoint_frames, self.frame_count)) for start in range(0, self.frame_count, self.checkpoint_frames)]
+        segment_paths = [os.path.join(parts_dir, f"segment_{start:09d}.mp4") for start, _ in ranges]
+        frames_done = sum(end - start for start, end in ranges if [start, end] in journal["segments"])
+        if frames_done:
+            print(f"Resuming export with {frames_done} of {self.frame_count} frames already done")
+
+        # Resuming seeks, which the frame cache's captures can't do, so this path always decodes
+        self.export_video.release()
+        video = cv2.VideoCapture(file_path)
+
+        try:
+            for (start, end), path in zip(ranges, segment_paths):
+                if [start, end] in journal["segments"]:
+                    continue
+
+                # Only the first segment after a finished one needs a seek
+                if int(video.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+                    video.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+                output_video = open_writer(encoder, path, self.fps, (self.width, self.height), self.encoder_threads)
+                for _ in range(start, end):
+                    lap = time.perf_counter()
+                    ret, frame = video.read()
+                    if not ret:
+                        break
+                    lap = self.progress.lap("decode", lap)
+                    frame = self.apply_enhancements(frame, *params)
+                    lap = self.progress.lap("enhance", lap)
+                    output_video.write(frame)
+                    self.progress.lap("encode", lap)
+                    frames_done += 1
+
+                    self.progress.update(frames_done)
+                output_video.release()
+
+                # The segment is on disk before the journal says so
+                journal["segments"].append([start, end])
+                self.save_journal(parts_dir, journal)
+
+            self.join_segments(segment_paths, output_file_path, parts_dir)
+        except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+            self.progress.fail(f"Error: {str(e)} (rerun to resume)")
+            return
+        finally:
+            video.release()
+
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        self.progress.finish("Video enhancement completed.")
+
+    def load_journal(self, parts_dir, file_path, settings):
+        # A journal only counts for the same source file and the same settings; otherwise start over
+        stat = os.stat(file_path)
+        source = {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        try:
+            with open(os.path.join(parts_dir, "journal.json")) as journal_file:
+                journal = json.load(journal_file)
+            if journal["source"] == source and journal["settings"] == settings:
+                return journal
+        except (OSError, ValueError, KeyError):
+            pass
+
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        os.makedirs(parts_dir)
+        return {"source": source, "settings": settings, "segments": []}
+
+    def save_journal(self, parts_dir, journal):
+        # Replace the journal in one step, so a crash leaves the old one or the new one
+        journal_path = os.path.join(parts_dir, "journal.json")
+        with open(journal_path + ".tmp", "w") as journal_file:
+            json.dump(journal, journal_file)
+        os.replace(journal_path + ".tmp", journal_path)
+
+    def plan_segments(self, file_path, frame_count, count):
+        # Even cuts moved to the nearest keyframe, so no segment decodes frames it throws away
+        keyframes = self.keyframe_indices(file_path)
+        boundaries = [0]
+        for i in range(1, count):
+            target = frame_count * i // count
+            if keyframes:
+                target = min(keyframes, key=lambda keyframe: abs(keyframe - target))
+            if boundaries[-1] < target < frame_count:
+                boundaries.append(target)
+        boundaries.append(frame_count)
+        return boundaries
+
+    def keyframe_indices(self, file_path, codec=None):
+        # Raw packet mode: grab() only demuxes, and the packet flags mark the keyframes.
+        # Returns nothing when the backend can't do that, and the cuts stay even.
+        # With a codec, only the keyframes a stream can be cut at without breaking the
+        # pictures around them: H.264 IDRs, and HEVC IDR/BLA pictures but not open GOP CRAs,
+        # whose leading pictures reference the GOP before them.
+        capture = cv2.VideoCapture(file_path)
+        keyframes = []
+        if capture.set(cv2.CAP_PROP_FORMAT, -1):
+            frame = 0
+            while capture.grab():
+                if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    if codec is None or self.is_clean_cut(capture, codec):
+                        keyframes.append(frame)
+                frame += 1
+        capture.release()
+        return keyframes
+
+    def is_clean_cut(self, capture, codec):
+        # The raw packets come out in Annex B form, NAL units after 00 00 01 start codes
+        if codec not in ("libx264", "libx265"):
+            return True
+        ret, packet = capture.retrieve()
+        if not ret:
+            return False
+        data = packet.tobytes()
+        start = data.find(b"\x00\x00\x01")
+        while 0 <= start < len(data) - 3:
+            header = data[start + 3]
+            if codec == "libx264" and header & 0x1F == 5:
+                return True
+            if codec == "libx265" and 16 <= (header >> 1) & 0x3F <= 20:
+                return True
+            start = data.find(b"\x00\x00\x01", start + 3)
+        return False
+
+    def join_segments(self, segment_paths, output_file_path, segment_dir):
+        # The concat demuxer copies the packets, so nothing is encoded twice
+        list_path = os.path.join(segment_dir, "segments.txt")
+        with open(list_path, "w") as list_file:
+            for path in segment_paths:
+                # Relative entries would be taken relative to the list file
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                list_file.write(f"file '{escaped}'\n")
+
+        command = ["ffmpeg", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_file_path]
+        subprocess.run(command, check=True)
+
+    def process_video_yuv(self, file_path, params, encoder_name):
+        brightness, contrast, saturation, sharpen = params
+
+        output_file_path = "enhanced_video.mp4"
+
+        # ffmpeg decodes and encodes in this mode
+        self.export_video.release()
+
+        if self.width % 2 or self.height % 2:
+            self.progress.fail("Error: YUV mode needs an even frame width and height.")
+            return
+
+        try:
+            decoder = subprocess.Popen(self.yuv_decoder_command(file_path), stdout=subprocess.PIPE)
+            encoder = self.open_yuv_writer(output_file_path, encoder_name)
+        except OSError as e:
+            self.progress.fail(f"Error: {str(e)}")
+            return
+
+        # One 4:2:0 frame is a full size Y plane and two quarter size U/V planes
+        frame_size = self.width * self.height * 3 // 2
+        source = np.empty(frame_size, np.uint8)
+        enhanced = np.empty(frame_size, np.uint8)
+        blurred = np.empty((self.height, self.width), np.uint8)
+        source_planes = self.split_yuv420(source, self.width, self.height)
+        enhanced_planes = self.split_yuv420(enhanced, self.width, self.height)
+        tables = self.build_yuv_tables(brightness, contrast, saturation)
 
         for i in range(self.frame_count):
-            ret, frame = self.video.read()
-            if ret:
-                enhanced_frame = self.apply_enhancements(frame, brightness, contrast, saturation, sharpen)
-                output_video.write(enhanced_frame)
+            lap = time.perf_counter()
+            if not self.read_exact(decoder.stdout, source):
+                break
+            lap = self.progress.lap("decode", lap)
 
-            progress = (i + 1) / self.frame_count * 100
-            self.progress_label.config(text=f"Processing: {int(progress)}%")
-            self.progress_bar["value"] = progress
-            self.window.update()
+            self.apply_enhancements_yuv(source_planes, enhanced_planes, tables, sharpen, blurred)
+            lap = self.progress.lap("enhance", lap)
+            encoder.write(enhanced)
+            self.progress.lap("encode", lap)
 
-        output_video.release()
-        self.video.release()
-        self.progress_label.config(text="Processing: 100%")
-        self.progress_bar["value"] = 100
-        self.window.update()
+            self.progress.update(i + 1)
 
-        self.error_label.config(text="Video enhancement completed.")
-        self.preview_video_original()
+        decoder.stdout.close()
+        decoder.wait()
+        try:
+            encoder.release()
+        except RuntimeError as e:
+            self.progress.fail(f"Error: {str(e)}")
+            return
+        self.progress.finish(f"Video enhancement completed ({encoder.report()}).")
+
+    def yuv_decoder_command(self, file_path):
+        return ["ffmpeg", "-v", "error", "-i", file_path, "-f", "rawvideo", "-pix_fmt", "yuv420p", "-"]
+
+    def open_yuv_writer(self, output_file_path, encoder_name):
+        # cv2 can't take YUV planes, so its mp4v choice becomes ffmpeg's mpeg4, the same codec
+        preset = ENCODER_PRESETS[encoder_name] or ENCODER_PRESETS["MPEG-4 (ffmpeg)"]
+        codec, speed = preset
+        return FfmpegWriter(output_file_path, self.fps, (self.width, self.height), codec, speed, self.encoder_threads, "yuv420p")
+
+    def read_exact(self, stream, buffer):
+        # Fill the preallocated buffer straight from the pipe
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(view):
+            count = stream.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def split_yuv420(self, buffer, width, height):
+        luma_size = width * height
+        chroma_size = luma_size // 4
+        y = buffer[:luma_size].reshape(height, width)
+        u = buffer[luma_size:luma_size + chroma_size].reshape(height // 2, width // 2)
+        v = buffer[luma_size + chroma_size:].reshape(height // 2, width // 2)
+        return y, u, v
+
+    def build_yuv_tables(self, brightness, contrast, saturation, hue=0):
+        # Luma: push neutral grays through the RGB chain so Y follows the same brightness/contrast curve.
+        # Y is limited range (16-235), as ffmpeg hands it out for ordinary video.
+        levels = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(np.uint8)
+        grays = cv2.merge([levels.reshape(1, 256)] * 3)
+        grays = self.apply_color_steps(grays, brightness, contrast, 1.0)
+        luma = np.clip(np.round(16 + grays[0, :, 1].astype(np.float32) * 219 / 255), 0, 255).astype(np.uint8)
+
+        # Chroma: saturation scales U/V around 128
+        chroma = np.clip(np.round(128 + (np.arange(256) - 128) * saturation), 0, 255).astype(np.uint8)
+
+        return {"luma": luma, "chroma": chroma, "saturation": saturation, "hue": hue}
+
+    def apply_enhancements_yuv(self, source_planes, enhanced_planes, tables, sharpen, blurred):
+        y, u, v = source_planes
+        enhanced_y, enhanced_u, enhanced_v = enhanced_planes
+
+        cv2.LUT(y, tables["luma"], enhanced_y)
+
+        # Sharpen luma only, the eye barely sees chroma detail
+        if self.sharpen_planner.get(sharpen) is not None:
+            self.sharpen(enhanced_y, sharpen, blurred, enhanced_y)
+
+        if tables["hue"] == 0:
+            cv2.LUT(u, tables["chroma"], enhanced_u)
+            cv2.LUT(v, tables["chroma"], enhanced_v)
+        else:
+            # Hue is a rotation of the U/V vector around 128
+            angle = np.deg2rad(tables["hue"])
+            cos = np.cos(angle) * tables["saturation"]
+            sin = np.sin(angle) * tables["saturation"]
+            centered_u = u.astype(np.float32) - 128
+            centered_v = v.astype(np.float32) - 128
+            enhanced_u[:] = np.clip(np.rint(centered_u * cos - centered_v * sin + 128), 0, 255)
+            enhanced_v[:] = np.clip(np.rint(centered_u * sin + centered_v * cos + 128), 0, 255)
 
     def apply_enhancements(self, frame, brightness=0, contrast=1.0, saturation=1.0, sharpen=0.0):
+        # Brightness, contrast and saturation are pointwise, so they run as one 3D LUT lookup
+        context = self.get_frame_context(frame)
+
+        self.compile_color_lut(brightness, contrast, saturation)
+        frame = self.apply_color_lut(frame, context)
+
+        # Apply sharpening (works per channel, so the BGR order doesn't matter).
+        # It drops out completely when it would leave the frame as it is.
+        if self.sharpen_planner.get(sharpen) is not None:
+            frame = context.use(self.sharpen(frame, sharpen, context.sharpened, context.output), context.output)
+
+        context.end_frame()
+        return frame
+
+    def apply_enhancements_batch(self, batch, brightness=0, contrast=1.0, saturation=1.0, sharpen=0.0, context=None):
+        # batch is (frames, height + 2, width, 3); the stack is treated as one tall image
+        count, padded_height, width = batch.shape[:3]
+        stacked = batch.reshape(count * padded_height, width, 3)
+        if context is None:
+            context = self.get_frame_context(stacked)
+
+        self.compile_color_lut(brightness, contrast, saturation)
+        frame = self.apply_color_lut(stacked, context)
+
+        if self.sharpen_planner.get(sharpen) is not None:
+            # Fill the spare rows the way filter2D's default border (reflect 101) would,
+            # so one pass over the stack matches filtering each frame on its own
+            frames = frame.reshape(count, padded_height, width, 3)
+            frames[:, 0] = frames[:, 2]
+            frames[:, -1] = frames[:, -3]
+            frame = context.use(self.sharpen(frame, sharpen, context.sharpened, context.output), context.output)
+
+        context.end_frame(count)
+        return frame.reshape(count, padded_height, width, 3)
+
+    def choose_batch_size(self, width, height):
+        # As many frames as fit in the budget with all their scratch buffers,
+        # about 27 bytes per pixel (see FrameContext)
+        budget = self.batch_memory_budget or self.cache_size()
+        frame_bytes = width * (height + 2) * 27
+        return int(max(1, min(self.max_batch_size, budget // frame_bytes)))
+
+    def cache_size(self):
+        # Last level cache size, 8 MB when the platform doesn't report it
+        for name in ("SC_LEVEL3_CACHE_SIZE", "SC_LEVEL2_CACHE_SIZE"):
+            try:
+                size = os.sysconf(name)
+            except (AttributeError, ValueError, OSError):
+                continue
+            if size > 0:
+                return size
+        return 8 * 1024 * 1024
+
+    def get_frame_context(self, frame):
+        # Reuse the buffers while the frame size stays the same
+        if self.frame_context is None or self.frame_context.shape != frame.shape[:2]:
+            self.frame_context = FrameContext(frame.shape[1], frame.shape[0])
+        return self.frame_context
+
+    def apply_color_steps(self, frame, brightness, contrast, saturation):
+        # Reference path: every adjustment does its own color conversion.
         # Convert BGR to RGB
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
@@ -140,13 +1688,78 @@ class VideoEnhancer:
         # Apply saturation adjustment
         frame_rgb = self.adjust_saturation(frame_rgb, saturation)
 
-        # Apply sharpening
-        frame_rgb = self.sharpen(frame_rgb, sharpen)
-
-        # Convert RGB to BGR
-        frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-
-        return frame_bgr
+        return frame_rgb
+
+    def compile_color_lut(self, brightness, contrast, saturation):
+        # Only rebuild the LUT when a slider value changed
+        key = (brightness, contrast, saturation, self.lut_size)
+        if self.color_lut_key == key:
+            return self.color_lut
+
+        # Identity settings leave the frame as it is, so there is nothing to interpolate
+        if (brightness, contrast, saturation) == (0, 1.0, 1.0):
+            self.color_lut = None
+            self.color_lut_key = key
+            return self.color_lut
+
+        # Nodes packed toward black: on dark pixels the hue is barely defined and the
+        # step-by-step chain swings by hundreds of levels between neighbouring values,
+        # so every level below 32 gets a node of its own and isn't interpolated at all
+        nodes = np.unique(np.concatenate((np.arange(32), np.round(255 * np.linspace(0, 1, self.lut_size) ** 2))))
+        n = len(nodes)
+
+        # Lattice of n x n red/green nodes for every blue value, one blue slice after the other.
+        # Keeping blue at full resolution makes the lookup a single bilinear remap.
+        g, b, r = np.meshgrid(nodes, np.arange(256), nodes, indexing="ij")
+        lattice = np.stack((b, g, r), axis=-1).reshape(n, 256 * n, 3).astype(np.uint8)
+
+        # Run the step-by-step chain once on the lattice
+        table = cv2.cvtColor(self.apply_color_steps(lattice, brightness, contrast, saturation), cv2.COLOR_RGB2BGR)
+
+        # Per-channel tables from 8-bit values to lattice coordinates
+        values = np.arange(256)
+        lower = np.clip(np.searchsorted(nodes, values, side="right") - 1, 0, n - 2)
+        frac = (values - nodes[lower]) / (nodes[lower + 1] - nodes[lower])
+
+        self.color_lut = {
+            "table": table,
+            "position": (lower + frac).astype(np.float32),
+            "slice_offset": (values * n).astype(np.float32),
+        }
+        self.color_lut_key = key
+        return self.color_lut
+
+    def apply_color_lut(self, frame, context):
+        lut = self.color_lut
+        if lut is None:
+            np.copyto(context.color, frame)
+            return context.color
+
+        b, g, r = context.planes
+        for channel, plane in enumerate(context.planes):
+            context.use(cv2.extractChannel(frame, channel, plane), plane)
+
+        # x picks red inside the blue slice, y picks green
+        context.use(cv2.LUT(r, lut["position"], context.map_x), context.map_x)
+        context.use(cv2.LUT(b, lut["slice_offset"], context.slice_offset), context.slice_offset)
+        context.use(cv2.add(context.map_x, context.slice_offset, context.map_x), context.map_x)
+        context.use(cv2.LUT(g, lut["position"], context.map_y), context.map_y)
+
+        return context.use(cv2.remap(lut["table"], context.map_x, context.map_y, cv2.INTER_LINEAR, context.color, cv2.BORDER_REPLICATE), context.color)
+
+    def check_color_lut(self, frame, brightness=0, contrast=1.0, saturation=1.0, tolerance=16, max_tolerance=48):
+        # Compare the LUT path against the step-by-step path on a real frame.
+        # The step-by-step chain rounds to 8 bits between its conversions and, above the
+        # near-black levels, jumps by up to about 42 levels between neighbouring colors, which
+        # no lattice follows. So the 99th percentile of the per-pixel error has a tight bound
+        # and the maximum one just above those jumps.
+        self.compile_color_lut(brightness, contrast, saturation)
+        fast = self.apply_color_lut(frame, FrameContext(frame.shape[1], frame.shape[0])).astype(np.int16)
+        reference = cv2.cvtColor(self.apply_color_steps(frame, brightness, contrast, saturation), cv2.COLOR_RGB2BGR).astype(np.int16)
+        error = np.abs(fast - reference).max(axis=2)
+        p99_error = float(np.percentile(error, 99))
+        max_error = int(error.max())
+        return p99_error <= tolerance and max_error <= max_tolerance, p99_error, max_error
 
     def adjust_brightness(self, frame, value):
         hsv = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
@@ -175,9 +1788,13 @@ class VideoEnhancer:
         frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
         return frame
 
-    def sharpen(self, frame, value):
-        blurred = cv2.filter2D(frame, -1, self.sharpening_kernel * value)
-        frame = cv2.addWeighted(frame, 1 + value, blurred, -value, 0)
+    def sharpen(self, frame, value, blurred=None, dst=None):
+        plan = self.sharpen_planner.get(value)
+        if plan is None:
+            return frame
+
+        blurred = self.sharpen_planner.run(frame, plan, blurred)
+        frame = cv2.addWeighted(frame, 1 + value, blurred, -value, 0, dst)
         return frame
 
     def preview_video_original(self):
@@ -233,7 +1850,10 @@ class VideoEnhancer:
         canvas.pack()
 
         img_tk = ImageTk.PhotoImage(img)
-        canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
+        canvas.image_id = canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
+
+        # Tk doesn't hold on to the image, so the canvas keeps it alive
+        canvas.image = img_tk
 
         return window
 
@@ -246,32 +1866,41 @@ class VideoEnhancer:
 
         self.close_preview()
 
-        self.video = cv2.VideoCapture(file_path)
+        self.video = self.open_video(file_path)
         ret, frame = self.video.read()
 
         if not ret:
             self.error_label.config(text="Error: Failed to read video frame.")
             return
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame_rgb = self.apply_enhancements(frame_rgb)
-        img = Image.fromarray(frame_rgb)
-        img = self.resize_image(img)
-        self.preview_window_modified = self.create_preview_window(img)
-
-        while ret:
-            ret, frame = self.video.read()
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame_rgb = self.apply_enhancements(frame_rgb)
-                img = Image.fromarray(frame_rgb)
-                img = self.resize_image(img)
-                img_tk = ImageTk.PhotoImage(img)
-                canvas = self.preview_window_modified.winfo_children()[0]
-                canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
-                self.preview_window_modified.update()
-
-        self.preview_window_modified.mainloop()
+        preview_frame = self.render_preview(frame, self.slider_values())
+        height, width = preview_frame.shape[:2]
+        self.preview_window_modified = self.create_preview_window(Image.new("RGB", (width, height)))
+        canvas = self.preview_window_modified.winfo_children()[0]
+
+        # Every frame goes into the same Tk image, so the canvas item never changes
+        sink = PhotoSink(canvas, width, height)
+        sink.show(preview_frame)
+        canvas.itemconfig(canvas.image_id, image=sink.image)
+        canvas.image = sink.image
+
+        # The rest plays from after() callbacks while a worker thread decodes and enhances
+        self.preview_player = PreviewPlayer(
+            self.preview_window_modified, self.video, self.render_preview, sink.show, self.slider_values, self.video.get(cv2.CAP_PROP_FPS)
+        )
+        self.preview_window_modified.bind("<Destroy>", lambda event: self.preview_player.stop())
+        self.preview_player.start()
+
+    def slider_values(self):
+        return (self.brightness_slider.get(), self.contrast_slider.get(), self.saturation_slider.get(), self.sharpen_slider.get())
+
+    def render_preview(self, frame, values):
+        # BGR at display size; the sink does the RGB conversion into its own buffer
+        frame = self.apply_enhancements(frame, *values)
+        size = self.display_size(frame.shape[1], frame.shape[0])
+        if size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame
 
     def close_preview(self):
         if self.preview_window_original:
@@ -283,19 +1912,254 @@ class VideoEnhancer:
             self.preview_window_modified = None
 
     def resize_image(self, image, max_width=800, max_height=600):
-        width, height = image.size
+        size = self.display_size(image.width, image.height, max_width, max_height)
+
+        if size != image.size:
+            image = image.resize(size)
 
+        return image
+
+    def display_size(self, width, height, max_width=800, max_height=600):
         if width > max_width or height > max_height:
             ratio = min(max_width / width, max_height / height)
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-            image = image.resize((new_width, new_height))
+            return int(width * ratio), int(height * ratio)
 
-        return image
+        return width, height
 
     def run(self):
         self.window.mainloop()
 
+# Encoder choices: None is cv2's mp4v, the rest are (ffmpeg codec, preset)
+ENCODER_PRESETS = {
+    "mp4v (OpenCV)": None,
+    "MPEG-4 (ffmpeg)": ("mpeg4", None),
+    "H.264 ultrafast": ("libx264", "ultrafast"),
+    "H.264 veryfast": ("libx264", "veryfast"),
+    "H.264 medium": ("libx264", "medium"),
+    "H.265 medium": ("libx265", "medium"),
+}
+
+# Worker processes start from a fresh interpreter that imports this module, on every platform.
+# A fork would copy the Tk interpreter and whatever locks the export thread and the ffmpeg pipes
+# hold at that moment.
+WORKER_PROCESSES = multiprocessing.get_context("spawn")
+
+def open_writer(encoder, path, fps, size, threads=0):
+    preset = ENCODER_PRESETS[encoder]
+    if preset is None:
+        return OpenCVWriter(path, fps, size)
+    codec, speed = preset
+    return FfmpegWriter(path, fps, size, codec, speed, threads)
+
+def encode_report(path, frames, seconds):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    fps = frames / seconds if seconds else 0.0
+    return f"{frames} frames encoded at {fps:.1f} fps, {size / 1e6:.1f} MB written"
+
+def export_segment(file_path, start, end, output_path, params, fps, size, encoder, frames_written, slot):
+    # Segment process: decode, enhance and encode frames [start, end) into their own file
+    video = cv2.VideoCapture(file_path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, start)
+    output_video = open_writer(encoder, output_path, fps, size)
+    engine = VideoEnhancer(gui=False)
+
+    for _ in range(start, end):
+        ret, frame = video.read()
+        if not ret:
+            break
+        output_video.write(engine.apply_enhancements(frame, *params))
+        frames_written[slot] += 1
+
+    output_video.release()
+    video.release()
+
+def enhance_slots(name, slots, shape, make_engine, tasks, results):
+    # Worker process side of SharedFrameRing: enhance each slot in place and report it back
+    shared = shared_memory.SharedMemory(name=name)
+    frames = np.ndarray((slots,) + shape, np.uint8, buffer=shared.buf)
+    engine = make_engine()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        slot, index, params = task
+        try:
+            np.copyto(frames[slot], engine.apply_enhancements(frames[slot], *params))
+            results.put((slot, index, None))
+        except Exception as e:
+            results.put((slot, index, str(e)))
+
+    del frames
+    shared.close()
+
+def make_sharpen_planner(sharpening_kernel):
+    # A zero kernel gives a black frame, and addWeighted(frame, 1, black, 0) is the frame itself
+    return KernelPlanner(lambda value: sharpening_kernel * value if value != 0 else None)
+
+def stream_frames(argv):
+    # Headless filter: raw or Y4M frames on stdin, enhanced frames in the same format on stdout
+    parser = argparse.ArgumentParser(description="Enhance a raw or Y4M frame stream from stdin to stdout.")
+    parser.add_argument("--stream", choices=["bgr24", "yuv420p", "y4m"], required=True)
+    parser.add_argument("--size", help="WIDTHxHEIGHT of raw frames")
+    parser.add_argument("--brightness", type=int, default=0)
+    parser.add_argument("--contrast", type=float, default=1.0)
+    parser.add_argument("--saturation", type=float, default=1.0)
+    parser.add_argument("--sharpen", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    engine = VideoEnhancer(gui=False)
+    source = sys.stdin.buffer
+    sink = sys.stdout.buffer
+
+    if args.stream == "y4m":
+        header = source.readline()
+        if not header.startswith(b"YUV4MPEG2 "):
+            parser.error("stdin is not a Y4M stream")
+        fields = {field[:1]: field[1:] for field in header.split()[1:]}
+        width, height = int(fields[b"W"]), int(fields[b"H"])
+        if fields.get(b"C", b"420jpeg") not in (b"420", b"420jpeg", b"420paldv", b"420mpeg2"):
+            parser.error("only 8-bit 4:2:0 Y4M streams are supported")
+        sink.write(header)
+    else:
+        if not args.size:
+            parser.error("--size is needed for raw frames")
+        width, height = map(int, args.size.split("x"))
+
+    if args.stream == "bgr24":
+        # Flat buffer for read_exact, frame view for the enhancer
+        source_buffer = np.empty(width * height * 3, np.uint8)
+        frame = source_buffer.reshape(height, width, 3)
+        while engine.read_exact(source, source_buffer):
+            sink.write(engine.apply_enhancements(frame, args.brightness, args.contrast, args.saturation, args.sharpen))
+        sink.flush()
+        return
+
+    if width % 2 or height % 2:
+        parser.error("4:2:0 frames need an even width and height")
+
+    frame_size = width * height * 3 // 2
+    source_buffer = np.empty(frame_size, np.uint8)
+    enhanced = np.empty(frame_size, np.uint8)
+    blurred = np.empty((height, width), np.uint8)
+    source_planes = engine.split_yuv420(source_buffer, width, height)
+    enhanced_planes = engine.split_yuv420(enhanced, width, height)
+    tables = engine.build_yuv_tables(args.brightness, args.contrast, args.saturation)
+
+    while True:
+        # Every Y4M frame has its own FRAME line in front of the planes
+        if args.stream == "y4m" and not source.readline().startswith(b"FRAME"):
+            break
+        if not engine.read_exact(source, source_buffer):
+            break
+
+        engine.apply_enhancements_yuv(source_planes, enhanced_planes, tables, args.sharpen, blurred)
+        if args.stream == "y4m":
+            sink.write(b"FRAME\n")
+        sink.write(enhanced)
+
+    sink.flush()
+
+def benchmark_sharpen(values=(0.0, 0.5, 1.0), repeats=20):
+    # Planned sharpening against rebuilding the kernel and filtering on every frame
+    sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+    planner = make_sharpen_planner(sharpening_kernel)
+    resolutions = [("480p", 854, 480), ("720p", 1280, 720), ("1080p", 1920, 1080), ("4K", 3840, 2160)]
+
+    for name, width, height in resolutions:
+        frame = np.random.randint(0, 256, (height, width, 3), np.uint8)
+        context = FrameContext(width, height)
+
+        for value in values:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                plan = planner.get(value)
+                if plan is not None:
+                    blurred = planner.run(frame, plan, context.sharpened)
+                    cv2.addWeighted(frame, 1 + value, blurred, -value, 0, context.output)
+            planned = (time.perf_counter() - start) / repeats * 1000
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                blurred = cv2.filter2D(frame, -1, sharpening_kernel * value)
+                cv2.addWeighted(frame, 1 + value, blurred, -value, 0)
+            per_frame = (time.perf_counter() - start) / repeats * 1000
+
+            print(f"{name} sharpen={value}: planned {planned:.2f} ms, per-frame kernel {per_frame:.2f} ms")
+
+def check_color_lut(video_path=None, samples=8):
+    # The LUT against the step-by-step chain over the slider range, on frames of the video
+    # or on one frame holding every 8-bit color. Exits with 1 when a setting is out of bounds.
+    engine = VideoEnhancer(gui=False)
+    if video_path:
+        video = cv2.VideoCapture(video_path)
+        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        for index in np.linspace(0, max(frame_count - 1, 0), samples).astype(int):
+            video.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = video.read()
+            if ret:
+                frames.append(frame)
+        video.release()
+        if not frames:
+            sys.exit(f"Can't read frames from {video_path}")
+    else:
+        colors = np.arange(256, dtype=np.uint8)
+        frames = [np.stack(np.meshgrid(colors, colors, colors, indexing="ij"), axis=-1).reshape(4096, 4096, 3)]
+
+    settings = [(0, 1.0, 1.0), (20, 1.2, 1.3), (30, 1.0, 1.0), (0, 1.5, 1.0), (0, 1.0, 2.0),
+                (-50, 0.5, 0.5), (50, 2.0, 2.0), (-100, 0.1, 0.1), (100, 3.0, 3.0),
+                (60, 2.5, 0.3), (-30, 1.8, 2.5), (80, 0.7, 2.8)]
+    failed = 0
+    for brightness, contrast, saturation in settings:
+        results = [engine.check_color_lut(frame, brightness, contrast, saturation) for frame in frames]
+        ok = all(result[0] for result in results)
+        p99_error = max(result[1] for result in results)
+        max_error = max(result[2] for result in results)
+        failed += not ok
+        print(f"brightness={brightness} contrast={contrast} saturation={saturation}: "
+              f"p99 error {p99_error:.0f}, max {max_error} {'ok' if ok else 'FAILED'}")
+    if failed:
+        sys.exit(1)
+
+def benchmark_display(size=(800, 450), repeats=200):
+    # Frames per second that reach the screen: a new PIL PhotoImage per frame against the PhotoSink
+    window = tk.Tk()
+    width, height = size
+    canvas = tk.Canvas(window, width=width, height=height)
+    canvas.pack()
+    frames = [np.random.randint(0, 256, (height, width, 3), np.uint8) for _ in range(8)]
+
+    image_id = canvas.create_image(0, 0, anchor=tk.NW)
+    start = time.perf_counter()
+    for index in range(repeats):
+        img_tk = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(frames[index % len(frames)], cv2.COLOR_BGR2RGB)))
+        canvas.itemconfig(image_id, image=img_tk)
+        canvas.image = img_tk
+        window.update()
+    per_frame = repeats / (time.perf_counter() - start)
+
+    sink = PhotoSink(canvas, width, height)
+    canvas.itemconfig(image_id, image=sink.image)
+    start = time.perf_counter()
+    for index in range(repeats):
+        sink.show(frames[index % len(frames)])
+        window.update()
+    persistent = repeats / (time.perf_counter() - start)
+
+    window.destroy()
+    print(f"{width}x{height}: PhotoImage per frame {per_frame:.1f} fps, PhotoSink {persistent:.1f} fps")
+
 if __name__ == "__main__":
-    enhancer = VideoEnhancer()
-    enhancer.run()
+    if "--benchmark-sharpen" in sys.argv:
+        benchmark_sharpen()
+    elif "--benchmark-display" in sys.argv:
+        benchmark_display()
+    elif "--check-color-lut" in sys.argv:
+        check_color_lut(*sys.argv[sys.argv.index("--check-color-lut") + 1:][:1])
+    elif any(arg.split("=")[0] == "--stream" for arg in sys.argv[1:]):
+        stream_frames(sys.argv[1:])
+    else:
+        enhancer = VideoEnhancer()
+        enhancer.run()
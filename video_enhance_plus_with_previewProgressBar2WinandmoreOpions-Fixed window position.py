@@ -15,8 +15,19 @@ class VideoEnhancer:
         self.preview_window_original = None
         self.preview_window_modified = None
 
+        # Live preview: the capture and downscaled first frame stay loaded between slider moves
+        self.reference_video = None
+        self.reference_path = None
+        self.reference = None
+        self.preview_image_modified = None
+        self.render_pending = None
+
         self.sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
 
+        # Cached enhancement plan and the slider values it was built for
+        self.plan = None
+        self.plan_key = None
+
     def create_widgets(self):
         # Select video button
         select_button = tk.Button(self.window, text="Select Video", command=self.select_video)
@@ -161,16 +172,60 @@ class VideoEnhancer:
         color = self.color_slider.get()
         sharpen = self.sharpen_slider.get()
 
-        frame = cv2.convertScaleAbs(frame, alpha=contrast * 0.01, beta=brightness)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        frame = cv2.convertScaleAbs(frame, alpha=saturation, beta=0)
-        frame = cv2.convertScaleAbs(frame, alpha=color, beta=0)
-
-        sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * sharpen)
-        frame = cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
-
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
+        # Rebuild the plan only when a slider moved
+        key = (brightness, contrast, saturation, color, sharpen)
+        if self.plan_key != key:
+            # The scales are the same for every channel, so they don't care about RGB/BGR order
+            # and the three of them collapse into a single lookup table
+            stages = [
+                ("brightness/contrast", True, lambda f: cv2.convertScaleAbs(f, alpha=contrast * 0.01, beta=brightness)),
+                ("saturation", True, lambda f: cv2.convertScaleAbs(f, alpha=saturation, beta=0)),
+                ("color", True, lambda f: cv2.convertScaleAbs(f, alpha=color, beta=0)),
+            ]
+            # Zero sharpening would leave the frame as it is, so the stage is left out
+            if sharpen != 0:
+                stages.append(("sharpen", False, lambda f: self.sharpen(f, sharpen)))
+            self.plan = self.plan_stages(stages)
+            self.plan_key = key
+
+        return self.run_plan(self.plan, frame)
+
+    def sharpen(self, frame, value):
+        sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * value)
+        return cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
+
+    def plan_stages(self, stages):
+        # Collapse each run of per-channel stages into one 256-entry lookup table per channel.
+        # Each stage is (name, per_channel, function); stages that mix channels are kept as they are.
+        plan = []
+        run = []
+
+        for name, per_channel, function in stages:
+            if per_channel:
+                run.append(function)
+                continue
+
+            if run:
+                plan.append(self.build_channel_lut(run))
+                run = []
+            plan.append(function)
+
+        if run:
+            plan.append(self.build_channel_lut(run))
+
+        return plan
+
+    def build_channel_lut(self, functions):
+        # Push every possible 8-bit value of each channel through the stages once
+        table = np.repeat(np.arange(256, dtype=np.uint8).reshape(1, 256, 1), 3, axis=2)
+        for function in functions:
+            table = function(table)
+
+        return lambda frame: cv2.LUT(frame, table)
+
+    def run_plan(self, plan, frame):
+        for function in plan:
+            frame = function(frame)
         return frame
 
     def preview_video_original(self):
@@ -214,33 +269,47 @@ class VideoEnhancer:
             return
 
         try:
-            if self.preview_window_modified is not None:
-                self.preview_window_modified.destroy()
-                self.preview_window_modified = None
-
-            video = cv2.VideoCapture(file_path)
-            _, frame = video.read()
+            frame = self.reference_frame(file_path)
 
             if frame is not None:
-                frame = cv2.resize(frame, (640, 320))
                 enhanced_frame = self.apply_enhancements(frame)
 
                 image = Image.fromarray(enhanced_frame)
-                image_tk = ImageTk.PhotoImage(image)
 
-                self.preview_window_modified = tk.Toplevel(self.window)
-                self.preview_window_modified.title("Preview Modified")
-                preview_label = tk.Label(self.preview_window_modified, image=image_tk)
-                preview_label.image = image_tk
-                preview_label.pack()
+                if self.preview_window_modified is None or not self.preview_window_modified.winfo_exists():
+                    self.preview_image_modified = ImageTk.PhotoImage(image)
 
-            video.release()
+                    self.preview_window_modified = tk.Toplevel(self.window)
+                    self.preview_window_modified.title("Preview Modified")
+                    preview_label = tk.Label(self.preview_window_modified, image=self.preview_image_modified)
+                    preview_label.pack()
+                else:
+                    # Same window and Tk image, only the pixels change
+                    self.preview_image_modified.paste(image)
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
+    def reference_frame(self, file_path):
+        # Decoded and downscaled once per file; slider moves only re-run the enhancement on it
+        if file_path != self.reference_path:
+            if self.reference_video is not None:
+                self.reference_video.release()
+            self.reference_video = cv2.VideoCapture(file_path)
+            ret, frame = self.reference_video.read()
+            self.reference = cv2.resize(frame, (640, 320)) if ret else None
+            self.reference_path = file_path
+        return self.reference
+
     def update_preview_modified(self, _):
-        if self.preview_window_modified is not None:
+        # A slider event only schedules a render; every event until it runs shares it,
+        # and it reads the sliders when it runs, so the latest values win
+        if self.preview_window_modified is not None and self.render_pending is None:
+            self.render_pending = self.window.after_idle(self.render_preview_modified)
+
+    def render_preview_modified(self):
+        self.render_pending = None
+        if self.preview_window_modified is not None and self.preview_window_modified.winfo_exists():
             self.preview_video_modified()
 
     def run(self):
@@ -15,6 +15,13 @@ class VideoEnhancer:
         self.preview_window_original = None
         self.preview_window_modified = None
 
+        # Live preview: the capture and downscaled first frame stay loaded between slider moves
+        self.reference_video = None
+        self.reference_path = None
+        self.reference = None
+        self.preview_image_modified = None
+        self.render_pending = None
+
         self.sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
 
     def create_widgets(self):
@@ -169,8 +176,10 @@ class VideoEnhancer:
         frame = cv2.merge((h, s, v))
         frame = cv2.cvtColor(frame, cv2.COLOR_HSV2RGB)
 
-        sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * sharpen)
-        frame = cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
+        # Zero sharpening would leave the frame as it is, so the filter is skipped
+        if sharpen != 0:
+            sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * sharpen)
+            frame = cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
 
         return frame
 
@@ -221,40 +230,54 @@ class VideoEnhancer:
             return
 
         try:
-            if self.preview_window_modified is not None:
-                self.preview_window_modified.destroy()
-                self.preview_window_modified = None
-
-            video = cv2.VideoCapture(file_path)
-            _, frame = video.read()
+            frame = self.reference_frame(file_path)
 
             if frame is not None:
-                frame = cv2.resize(frame, (640, 320))
                 frame = self.apply_enhancements(frame)
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
                 image = Image.fromarray(frame)
-                image_tk = ImageTk.PhotoImage(image)
 
-                self.preview_window_modified = tk.Toplevel(self.window)
-                self.preview_window_modified.title("Preview Modified")
+                if self.preview_window_modified is None or not self.preview_window_modified.winfo_exists():
+                    self.preview_image_modified = ImageTk.PhotoImage(image)
 
-                # Set the fixed position for the window
-                x_offset = 1837  # Adjust the x-coordinate as desired
-                y_offset = 35    # Adjust the y-coordinate as desired
-                self.preview_window_modified.geometry(f"640x320+{x_offset}+{y_offset}")
+                    self.preview_window_modified = tk.Toplevel(self.window)
+                    self.preview_window_modified.title("Preview Modified")
 
-                preview_label = tk.Label(self.preview_window_modified, image=image_tk)
-                preview_label.image = image_tk
-                preview_label.pack()
+                    # Set the fixed position for the window
+                    x_offset = 1837  # Adjust the x-coordinate as desired
+                    y_offset = 35    # Adjust the y-coordinate as desired
+                    self.preview_window_modified.geometry(f"640x320+{x_offset}+{y_offset}")
 
-            video.release()
+                    preview_label = tk.Label(self.preview_window_modified, image=self.preview_image_modified)
+                    preview_label.pack()
+                else:
+                    # Same window and Tk image, only the pixels change
+                    self.preview_image_modified.paste(image)
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def update_preview_modified(self, event):
-        if self.preview_window_modified is not None:
+    def reference_frame(self, file_path):
+        # Decoded and downscaled once per file; slider moves only re-run the enhancement on it
+        if file_path != self.reference_path:
+            if self.reference_video is not None:
+                self.reference_video.release()
+            self.reference_video = cv2.VideoCapture(file_path)
+            ret, frame = self.reference_video.read()
+            self.reference = cv2.resize(frame, (640, 320)) if ret else None
+            self.reference_path = file_path
+        return self.reference
+
+    def update_preview_modified(self, _):
+        # A slider event only schedules a render; every event until it runs shares it,
+        # and it reads the sliders when it runs, so the latest values win
+        if self.preview_window_modified is not None and self.render_pending is None:
+            self.render_pending = self.window.after_idle(self.render_preview_modified)
+
+    def render_preview_modified(self):
+        self.render_pending = None
+        if self.preview_window_modified is not None and self.preview_window_modified.winfo_exists():
             self.preview_video_modified()
 
     def run(self):
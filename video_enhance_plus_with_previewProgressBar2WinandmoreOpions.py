@@ -15,8 +15,18 @@ class VideoEnhancer:
         self.preview_window_original = None
         self.preview_window_modified = None
 
+        # Live preview: the capture and downscaled first frame stay loaded between slider moves
+        self.reference_video = None
+        self.reference_path = None
+        self.reference = None
+        self.preview_image_modified = None
+        self.render_pending = None
+
         self.sharpening_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
 
+        # Forward and inverse conversions for stages that don't work on RGB
+        self.color_conversions = {"hsv": (cv2.COLOR_RGB2HSV, cv2.COLOR_HSV2RGB)}
+
     def create_widgets(self):
         # Select video button
         select_button = tk.Button(self.window, text="Select Video", command=self.select_video)
@@ -175,24 +185,53 @@ class VideoEnhancer:
         sharpen = self.sharpen_slider.get()
         hue = self.hue_slider.get()
 
-        frame = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
+        stages = [("rgb", lambda f: cv2.convertScaleAbs(f, alpha=contrast, beta=brightness))]
+        stages.append(("hsv", lambda f: self.adjust_saturation_color(f, saturation, color)))
+        # A zero kernel leaves the frame as it is, so skip the stage and let the HSV stages merge
+        if sharpen != 0:
+            stages.append(("rgb", lambda f: self.sharpen(f, sharpen)))
+        if hue != 0:
+            stages.append(("hsv", lambda f: self.adjust_hue(f, hue)))
+
+        return self.run_stages(self.optimize_stages(stages), frame)
+
+    def optimize_stages(self, stages):
+        # Merge adjacent stages that work in the same color space, so each group
+        # converts into that space once and back once
+        groups = []
+        for space, function in stages:
+            if groups and groups[-1][0] == space:
+                groups[-1][1].append(function)
+            else:
+                groups.append((space, [function]))
+        return groups
+
+    def run_stages(self, groups, frame):
+        for space, functions in groups:
+            if space in self.color_conversions:
+                frame = cv2.cvtColor(frame, self.color_conversions[space][0])
+
+            for function in functions:
+                frame = function(frame)
+
+            if space in self.color_conversions:
+                frame = cv2.cvtColor(frame, self.color_conversions[space][1])
+        return frame
+
+    def adjust_saturation_color(self, frame, saturation, color):
         h, s, v = cv2.split(frame)
         s = cv2.multiply(s, saturation)
         v = cv2.multiply(v, color)
-        frame = cv2.merge((h, s, v))
-        frame = cv2.cvtColor(frame, cv2.COLOR_HSV2RGB)
+        return cv2.merge((h, s, v))
 
-        sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * sharpen)
-        frame = cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
-
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
+    def adjust_hue(self, frame, hue):
         h, s, v = cv2.split(frame)
         h = cv2.add(h, hue)
-        frame = cv2.merge((h, s, v))
-        frame = cv2.cvtColor(frame, cv2.COLOR_HSV2RGB)
+        return cv2.merge((h, s, v))
 
-        return frame
+    def sharpen(self, frame, value):
+        sharpened_frame = cv2.filter2D(frame, -1, self.sharpening_kernel * value)
+        return cv2.addWeighted(frame, 1.0, sharpened_frame, 1.0, 0.0)
 
     def preview_video_original(self):
         file_path = self.file_var.get()
@@ -235,34 +274,48 @@ class VideoEnhancer:
             return
 
         try:
-            if self.preview_window_modified is not None:
-                self.preview_window_modified.destroy()
-                self.preview_window_modified = None
-
-            video = cv2.VideoCapture(file_path)
-            _, frame = video.read()
+            frame = self.reference_frame(file_path)
 
             if frame is not None:
                 frame = self.apply_enhancements(frame)
-                frame = cv2.resize(frame, (640, 320))
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
                 image = Image.fromarray(frame)
-                image_tk = ImageTk.PhotoImage(image)
 
-                self.preview_window_modified = tk.Toplevel(self.window)
-                self.preview_window_modified.title("Preview Modified")
-                preview_label = tk.Label(self.preview_window_modified, image=image_tk)
-                preview_label.image = image_tk
-                preview_label.pack()
+                if self.preview_window_modified is None or not self.preview_window_modified.winfo_exists():
+                    self.preview_image_modified = ImageTk.PhotoImage(image)
 
-            video.release()
+                    self.preview_window_modified = tk.Toplevel(self.window)
+                    self.preview_window_modified.title("Preview Modified")
+                    preview_label = tk.Label(self.preview_window_modified, image=self.preview_image_modified)
+                    preview_label.pack()
+                else:
+                    # Same window and Tk image, only the pixels change
+                    self.preview_image_modified.paste(image)
 
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def update_preview_modified(self, event):
-        if self.preview_window_modified is not None:
+    def reference_frame(self, file_path):
+        # Decoded and downscaled once per file; slider moves only re-run the enhancement on it
+        if file_path != self.reference_path:
+            if self.reference_video is not None:
+                self.reference_video.release()
+            self.reference_video = cv2.VideoCapture(file_path)
+            ret, frame = self.reference_video.read()
+            self.reference = cv2.resize(frame, (640, 320)) if ret else None
+            self.reference_path = file_path
+        return self.reference
+
+    def update_preview_modified(self, _):
+        # A slider event only schedules a render; every event until it runs shares it,
+        # and it reads the sliders when it runs, so the latest values win
+        if self.preview_window_modified is not None and self.render_pending is None:
+            self.render_pending = self.window.after_idle(self.render_preview_modified)
+
+    def render_preview_modified(self):
+        self.render_pending = None
+        if self.preview_window_modified is not None and self.preview_window_modified.winfo_exists():
             self.preview_video_modified()
 
     def run(self):
@@ -1,9 +1,58 @@
 import sys
+import time
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QSlider, QVBoxLayout, QWidget, QFileDialog
 import cv2
 
+class PresentationClock:
+    # Frame n of the file is due at start + n / fps on the wall clock. The player arms its timer
+    # for the next frame's due time instead of a fixed interval, and frames whose time has
+    # already passed are skipped without being converted or enhanced.
+    def __init__(self, fps, max_skips=10):
+        # Some containers report 0 for the frame rate
+        self.fps = fps if fps > 0 else 30.0
+        self.start_time = 0.0
+        self.start_frame = 0
+
+        # Late frames skipped in a row before one is shown anyway, so a decoder that can't
+        # keep up still puts a frame on screen every so often instead of grabbing forever
+        self.max_skips = max_skips
+
+        self.shown = 0
+        self.dropped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def start(self, frame):
+        # frame is due now; called whenever playback starts or resumes
+        self.start_time = time.perf_counter()
+        self.start_frame = frame
+
+    def due_time(self, frame):
+        return self.start_time + (frame - self.start_frame) / self.fps
+
+    def is_late(self, frame):
+        # Too late once the frame after it is due as well
+        return time.perf_counter() >= self.due_time(frame + 1)
+
+    def delay_ms(self, frame):
+        return max(0, int((self.due_time(frame) - time.perf_counter()) * 1000))
+
+    def drop(self):
+        self.dropped += 1
+
+    def frame_shown(self, frame):
+        jitter = abs(time.perf_counter() - self.due_time(frame)) * 1000
+        self.shown += 1
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+
+    def report(self):
+        mean = self.jitter_total / self.shown if self.shown else 0.0
+        return (f"{self.shown} frames shown, {self.dropped} dropped at {self.fps:.2f} fps, "
+                f"jitter {mean:.1f} ms mean, {self.jitter_max:.1f} ms max")
+
 class VideoEnhancerGUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -17,6 +66,7 @@ class VideoEnhancerGUI(QMainWindow):
         self.video_player = QLabel(self)
         self.video_player.setAlignment(Qt.AlignCenter)
         self.video_timer = QTimer(self)
+        self.video_timer.setSingleShot(True)
         self.video_timer.timeout.connect(self.update_frame)
 
         # Create sliders for enhancement parameters
@@ -60,19 +110,28 @@ class VideoEnhancerGUI(QMainWindow):
         widget.setLayout(layout)
         self.setCentralWidget(widget)
 
-        # Initialize the video capture
+        # Initialize the video capture and the clock it plays by
         self.video_capture = None
+        self.clock = None
+        self.next_frame = 0
 
     def open_video_file(self):
         file_dialog = QFileDialog()
         video_path, _ = file_dialog.getOpenFileName(self, 'Open Video File', '', 'Video Files (*.mp4 *.avi)')
         if video_path:
             self.video_capture = cv2.VideoCapture(video_path)
+            self.clock = PresentationClock(self.video_capture.get(cv2.CAP_PROP_FPS))
+            self.next_frame = 0
             self.play_video()
 
     def play_video(self):
+        if self.clock is None:
+            return
+
         if not self.video_timer.isActive():
-            self.video_timer.start(33)  # Update frame every 33 milliseconds (approx. 30 FPS)
+            # The next frame is due right away, the ones after it at the file's frame rate
+            self.clock.start(self.next_frame)
+            self.video_timer.start(0)
             self.play_button.setText('Pause')
         else:
             self.video_timer.stop()
@@ -81,10 +140,23 @@ class VideoEnhancerGUI(QMainWindow):
     def stop_video(self):
         self.video_timer.stop()
         self.video_capture.release()
+        # Playback stats for the run that just ended
+        self.statusBar().showMessage(self.clock.report())
         self.video_player.clear()
         self.play_button.setText('Play')
 
     def update_frame(self):
+        # Frames whose time has passed are only grabbed, so playback keeps the file's speed
+        # when the processing falls behind
+        for _ in range(self.clock.max_skips):
+            if not self.clock.is_late(self.next_frame):
+                break
+            if not self.video_capture.grab():
+                self.play_button.setText('Play')
+                return
+            self.clock.drop()
+            self.next_frame += 1
+
         ret, frame = self.video_capture.read()
         if ret:
             if self.enhancements_enabled:
@@ -101,6 +173,13 @@ class VideoEnhancerGUI(QMainWindow):
 
             # Display the frame in the QLabel
             self.video_player.setPixmap(QPixmap.fromImage(q_image))
+            self.clock.frame_shown(self.next_frame)
+
+            # Wait for the next frame's time
+            self.next_frame += 1
+            self.video_timer.start(self.clock.delay_ms(self.next_frame))
+        else:
+            self.play_button.setText('Play')
 
     def toggle_enhancements(self):
         self.enhancements_enabled = not self.enhancements_enabled
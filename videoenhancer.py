@@ -1,8 +1,142 @@
+import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 import cv2
 import numpy as np
 
+class FramePipeline:
+    # Decode -> enhance -> encode on separate threads joined by bounded queues.
+    # The writer puts results back in the order the reader produced them.
+    def __init__(self, read, process, write, workers=1, queue_size=8):
+        self.read = read
+        self.process = process
+        self.write = write
+        self.workers = workers
+        self.decoded = queue.Queue(queue_size)
+        self.enhanced = queue.Queue(queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.error = None
+        self.written = 0
+
+        # Seconds each stage spent working and waiting on its queues
+        self.stats = {stage: {"busy": 0.0, "stalled": 0.0} for stage in ("read", "enhance", "write")}
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.read_loop, daemon=True)]
+        self.threads += [threading.Thread(target=self.enhance_loop, daemon=True) for _ in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.write_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def run(self):
+        self.start()
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def record(self, stage, kind, start):
+        with self.lock:
+            self.stats[stage][kind] += time.perf_counter() - start
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+
+    def read_loop(self):
+        index = 0
+        try:
+            while self.error is None:
+                start = time.perf_counter()
+                item = self.read()
+                self.record("read", "busy", start)
+                if item is None:
+                    break
+
+                # Blocking here means the enhancement workers can't keep up
+                start = time.perf_counter()
+                self.decoded.put((index, item))
+                self.record("read", "stalled", start)
+                index += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.workers):
+                self.decoded.put(None)
+
+    def enhance_loop(self):
+        while True:
+            start = time.perf_counter()
+            job = self.decoded.get()
+            self.record("enhance", "stalled", start)
+            if job is None:
+                break
+
+            index, item = job
+            start = time.perf_counter()
+            try:
+                result = self.process(item)
+            except Exception as e:
+                self.fail(e)
+                continue
+            self.record("enhance", "busy", start)
+
+            start = time.perf_counter()
+            self.enhanced.put((index, result))
+            self.record("enhance", "stalled", start)
+
+        self.enhanced.put(None)
+
+    def write_loop(self):
+        pending = {}
+        next_index = 0
+        finished = 0
+        while finished < self.workers:
+            start = time.perf_counter()
+            job = self.enhanced.get()
+            self.record("write", "stalled", start)
+            if job is None:
+                finished += 1
+                continue
+
+            index, result = job
+            pending[index] = result
+            while next_index in pending:
+                result = pending.pop(next_index)
+                next_index += 1
+                if self.error is not None:
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    self.write(result)
+                except Exception as e:
+                    self.fail(e)
+                self.record("write", "busy", start)
+                self.written += 1
+
+    def summary(self):
+        # The stage that stalls the least (per thread) is the one holding the others back
+        threads = {"read": 1, "enhance": self.workers, "write": 1}
+        stalled = {stage: times["stalled"] / threads[stage] for stage, times in self.stats.items()}
+        lines = [f"{stage}: busy {times['busy']:.2f}s, stalled {times['stalled']:.2f}s" for stage, times in self.stats.items()]
+        limiting = min(stalled, key=stalled.get)
+        lines.append(f"limited by: {limiting}")
+        return "\n".join(lines)
+
+def enhance_frame(frame):
+    # Apply video enhancement effects to the frame
+    enhanced_frame = cv2.GaussianBlur(frame, (0, 0), 3)
+    return cv2.addWeighted(frame, 1.5, enhanced_frame, -0.5, 0)
+
 def enhance_video():
     # Function to enhance the selected video
     
@@ -29,24 +163,24 @@ def enhance_video():
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         writer = cv2.VideoWriter(output_file, fourcc, fps, (width, height))
         
-        # Process each frame of the video
-        for _ in range(frame_count):
-            ret, frame = video.read()
-            
-            if ret:
-                # Apply video enhancement effects to the frame
-                enhanced_frame = cv2.GaussianBlur(frame, (0, 0), 3)
-                enhanced_frame = cv2.addWeighted(frame, 1.5, enhanced_frame, -0.5, 0)
-                
-                # Write the enhanced frame to the output video file
-                writer.write(enhanced_frame)
+        # Decode, enhance and encode each frame of the video on their own threads
+        def read_frames():
+            for _ in range(frame_count):
+                ret, frame = video.read()
+                if ret:
+                    yield frame
         
-        # Release resources
-        video.release()
-        writer.release()
+        frames = read_frames()
+        pipeline = FramePipeline(lambda: next(frames, None), enhance_frame, writer.write, workers=enhance_workers)
+        try:
+            pipeline.run()
+        finally:
+            # Release resources, also after a failure
+            video.release()
+            writer.release()
         
-        # Display success message
-        error_label.config(text="Video enhanced successfully!")
+        # Display success message, and which stage held the others back
+        error_label.config(text=f"Video enhanced successfully!\n{pipeline.summary()}")
         
     except Exception as e:
         # Print the error message to the terminal
@@ -64,6 +198,9 @@ window.title("Video Enhancer")
 # File path variable
 file_var = tk.StringVar()
 
+# Enhancement threads next to the reader and writer threads
+enhance_workers = max(1, (os.cpu_count() or 3) - 2)
+
 # Select video button
 select_button = tk.Button(window, text="Select Video", command=select_video)
 select_button.pack()
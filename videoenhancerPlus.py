@@ -3,6 +3,44 @@ from tkinter import filedialog
 import cv2
 import numpy as np
 
+def plan_stages(stages):
+    # Collapse each run of per-channel stages into one 256-entry lookup table per channel.
+    # Each stage is (name, per_channel, function); stages that mix channels are kept as they are.
+    plan = []
+    run = []
+
+    for name, per_channel, function in stages:
+        if per_channel:
+            run.append(function)
+            continue
+
+        if run:
+            plan.append(build_channel_lut(run))
+            run = []
+        plan.append(function)
+
+    if run:
+        plan.append(build_channel_lut(run))
+
+    return plan
+
+def build_channel_lut(functions):
+    # Push every possible 8-bit value of each channel through the stages once
+    table = np.repeat(np.arange(256, dtype=np.uint8).reshape(1, 256, 1), 3, axis=2)
+    for function in functions:
+        table = function(table)
+
+    return lambda frame: cv2.LUT(frame, table)
+
+def run_plan(plan, frame):
+    for function in plan:
+        frame = function(frame)
+    return frame
+
+def unsharp_mask(frame):
+    blurred = cv2.GaussianBlur(frame, (0, 0), 2)
+    return cv2.addWeighted(frame, 1.5, blurred, -0.5, 0)
+
 def enhance_video():
     # Function to enhance the selected video
     
@@ -29,16 +67,20 @@ def enhance_video():
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         writer = cv2.VideoWriter(output_file, fourcc, fps, (width, height))
         
+        # Enhancement stages; the brightness/contrast scale becomes a lookup table
+        plan = plan_stages([
+            ("unsharp", False, unsharp_mask),
+            ("brightness/contrast", True, lambda f: cv2.convertScaleAbs(f, alpha=1.2, beta=10)),
+            #("median", False, lambda f: cv2.medianBlur(f, 5)),
+        ])
+        
         # Process each frame of the video
         for _ in range(frame_count):
             ret, frame = video.read()
             
             if ret:
                 # Apply video enhancement effects to the frame
-                enhanced_frame = cv2.GaussianBlur(frame, (0, 0), 2)
-                enhanced_frame = cv2.addWeighted(frame, 1.5, enhanced_frame, -0.5, 0)
-                enhanced_frame = cv2.convertScaleAbs(enhanced_frame, alpha=1.2, beta=10)
-                #enhanced_frame = cv2.medianBlur(enhanced_frame, 5)
+                enhanced_frame = run_plan(plan, frame)
                 #enhanced_frame = cv2.Laplacian(enhanced_frame, cv2.CV_64F)
                 
                 # Write the enhanced frame to the output video file